@@ -1,122 +1,124 @@
-import requests
 import datetime
+import io
+import os
 import pytz
-from iris import ChatContext, PyKV
-
-all_url = "https://api.upbit.com/v1/market/all"
-base_url = "https://api.upbit.com/v1/ticker?markets="
-currency_url = "https://m.search.naver.com/p/csearch/content/qapirender.nhn?key=calculator&pkid=141&q=%ED%99%98%EC%9C%A8&where=m&u1=keb&u6=standardUnit&u7=0&u3=USD&u4=KRW&u8=down&u2=1"
-binance_url = "https://api.binance.com/api/v3/ticker/"
-
-def get_coin_info(chat: ChatContext):
-    match chat.message.command:
-        case "!코인":
-            if chat.message.has_param:
-                get_upbit(chat)
-            else:
-                get_upbit_all(chat)
-        case "!내코인":
-            get_my_coins(chat)
-        case "!바낸":
-            get_binance(chat)
-        case "!김프":
-            get_kimchi_premium(chat)
-        case "!달러":
-            usd_to_krw(chat)
-        case "!코인등록":
-            coin_add(chat)
-        case "!코인삭제":
-            coin_remove(chat)
+from iris import ChatContext
+from helper.CommandRouter import command
+from helper.CoinMarket import market_catalog, upbit_tickers, binance_tickers, format_age, gather, Source
+from helper.CoinConvert import conversion_graph, pair_symbols, format_rate
+from helper.FxRate import fx_rate
+from helper.PriceAlert import alert_engine, parse_price, format_price, ALERT_LIMIT
+from helper.KimchiPremium import kimchi_sampler, render_chart
+from helper.BanControl import parse_duration
+from helper.CoinPortfolio import load_portfolio, save_portfolio, register_room_member, room_members, rank_portfolios
+
+
+def start_services(iris_endpoint: str):
+    """
+    코인 백그라운드 작업을 시작합니다. 봇 시작을 막지 않도록 irispy.py가 별도 스레드에서 부릅니다.
+    가격 알림 감시(등록된 알림이 없으면 요청하지 않음), 김프 기록(!김프차트),
+    COIN_STREAM=1 이면 업비트/바이낸스 WebSocket 시세
+    """
+    alert_engine.start(iris_endpoint)
+    kimchi_sampler.start()
+    if os.getenv("COIN_STREAM") == "1":
+        from helper.CoinStream import start_streams
+        start_streams()
 
-def get_upbit(chat: ChatContext):
-    kv = PyKV()
-    query = chat.message.param.upper()
-    res = requests.get(base_url + 'KRW-' + query)
-    if 'error' in res.text:
-        try:
-            result_json, query = get_upbit_korean(query)
-        except:
-            chat.reply("검색된 코인이 없습니다.")
-            return None
 
+@command("!코인")
+def get_coin(chat: ChatContext):
+    if chat.message.has_param:
+        get_upbit(chat)
     else:
-        result_json = res.json()[0]
+        get_upbit_all(chat)
+
+def get_upbit(chat: ChatContext):
+    market = market_catalog.resolve(chat.message.param)
+    if market is None:
+        chat.reply("검색된 코인이 없습니다.")
+        return None
+
+    query = market.symbol
+    ticker = upbit_tickers.get(market.market)
+    if ticker is None:
+        chat.reply("시세를 가져오지 못했습니다.")
+        return None
     
-    price = result_json['trade_price']
-    change = result_json['signed_change_rate']*100
+    price = ticker.price
+    change = ticker.change
     if price % 1 == 0:
         price = int(price)
     
     result = query + f'\n현재가 : {price:,}원\n등락률 : {change:,.2f}%'
-    try:
-        user_coin_info = kv.get(f"coin.{str(chat.sender.id)}")[query]
-        amount = user_coin_info["amount"]
-        average = user_coin_info["average"]
+    holding = load_portfolio(chat.sender.id).holding(query)
+    if holding:
+        amount, average = holding
         seed = average*amount
-        total = round(result_json['trade_price']*amount,0)
+        total = round(ticker.price*amount,0)
         percent = round((total/seed-1)*100,1)
         plus_mark = "+" if percent > 0 else ""
         result += f'\n총평가금액 : {total:,.0f}원({plus_mark}{percent:,.1f}%)\n총매수금액 : {seed:,.0f}원\n보유수량 : {amount:,.0f}개\n평균단가 : {average:,}원'
-    except:
-        pass        
+    result += f'\n({format_age([ticker])})'
     chat.reply(result)
 
+@command("!내코인")
 def get_my_coins(chat: ChatContext):
-    kv = PyKV()
-    my_coins = kv.get(f"coin.{str(chat.sender.id)}")
-    if not my_coins:
+    portfolio = load_portfolio(chat.sender.id)
+    if not portfolio:
         chat.reply("등록된 코인이 없습니다. !코인등록 기능으로 코인을 등록하세요.")
         return None
+    register_room_member(chat.room.id, chat.sender.id, chat.sender.name)
 
-    my_coins_list = []
-    for key in my_coins.keys():
-        my_coins_list.append("KRW-" + key)
-    
-    coins_query = ",".join(my_coins_list)
-    
-    res = requests.get(base_url + coins_query)
+    tickers = upbit_tickers.get_many([market for market in portfolio.markets() if market_catalog.has(market)])
+    valuation = portfolio.value(tickers)
     
     result_list = []
-    coins = {}
-    current_total = 0
-    bought_total = 0
-    
-    for coin in res.json():
-        coins[coin['market'][4:]] = {'price' : coin['trade_price'], 'change' : coin['signed_change_rate']*100}
-    
-    for key in coins.keys():
-        to_append = f'{key}\n현재가 : {coins[key]["price"]} 원\n등락률 : {coins[key]["change"]:.2f} %'
-        amount = my_coins[key]["amount"]
-        average = my_coins[key]["average"]
-        seed = average*amount
-        total = round(coins[key]["price"]*amount,0)
-        percent = round((total/seed-1)*100,1)
-        plus_mark = "+" if percent > 0 else ""
-        to_append = to_append + f'\n총평가금액 : {total:,.0f}원({plus_mark}{percent:,.1f}%)\n총매수금액 : {seed:,.0f}원\n보유수량 : {amount:,.0f}개\n평균단가 : {average:,}원'
-        result_list.append(to_append)
-        current_total += total
-        bought_total += seed
+    for i, key in enumerate(valuation.symbols):
+        plus_mark = "+" if valuation.percent[i] > 0 else ""
+        result_list.append(
+            f'{key}\n현재가 : {float(valuation.price[i])} 원\n등락률 : {valuation.change[i]:.2f} %'
+            f'\n총평가금액 : {valuation.total[i]:,.0f}원({plus_mark}{valuation.percent[i]:,.1f}%)\n총매수금액 : {valuation.seed[i]:,.0f}원\n보유수량 : {valuation.amount[i]:,.0f}개\n평균단가 : {valuation.average[i]:,}원'
+        )
     result = '\n\n'.join(result_list)
-    total_change = round((current_total/bought_total-1)*100,1)
-    result = '내 코인\n' + '\u200b'*500 + f'\n전체\n총평가 : {current_total:,.0f}원\n총매수 : {bought_total:,.0f}원\n평가손익 : {current_total-bought_total:+,.0f}원\n수익률 : {total_change:+,.1f}%\n\n' + result
+    current_total = valuation.current_total
+    bought_total = valuation.bought_total
+    total_change = round(valuation.total_change,1)
+    result = f'내 코인 ({format_age(tickers.values())})\n' + '\u200b'*500 + f'\n전체\n총평가 : {current_total:,.0f}원\n총매수 : {bought_total:,.0f}원\n평가손익 : {current_total-bought_total:+,.0f}원\n수익률 : {total_change:+,.1f}%\n\n' + result
     
     chat.reply(result)
+
+@command("!코인랭킹", shared=True)
+def get_coin_ranking(chat: ChatContext):
+    portfolios = {}
+    for user_id, name in room_members(chat.room.id).items():
+        portfolio = load_portfolio(user_id)
+        if portfolio:
+            portfolios[user_id] = (name, portfolio)
+    if not portfolios:
+        chat.reply("이 방에 등록된 코인이 없습니다. !코인등록 기능으로 코인을 등록하세요.")
+        return None
+
+    markets = {market for _, portfolio in portfolios.values() for market in portfolio.markets() if market_catalog.has(market)}
+    tickers = upbit_tickers.get_many(markets)
+    ranking = rank_portfolios(portfolios, tickers)
+
+    result_list = []
+    for rank, entry in enumerate(ranking, start=1):
+        result_list.append(f'{rank}. {entry.name}\n수익률 : {entry.percent:+,.1f}% (평가손익 {entry.current_total-entry.bought_total:+,.0f}원)')
+    chat.reply(f'코인 수익률 랭킹 ({format_age(tickers.values())})\n' + '\u200b'*500 + '\n' + '\n\n'.join(result_list))
     
 def get_upbit_all(chat: ChatContext):
-    res = requests.get(all_url)
-    krw_coins = []
-    for market in res.json():
-        if 'KRW' in market['market']:
-            krw_coins.append(market['market'])
+    krw_coins = [market.market for market in market_catalog.krw_markets()]
 
-    res = requests.get(base_url + ','.join(krw_coins))
+    tickers = upbit_tickers.get_many(krw_coins)
     
     result_list = []
     coins = {}
-    result_list.append('업비트 원화시세\n' + '\u200b'*500)
+    result_list.append(f'업비트 원화시세 ({format_age(tickers.values())})\n' + '\u200b'*500)
 
-    for coin in res.json():
-        coins[coin['market'][4:]] = {'price' : coin['trade_price'], 'change' : coin['signed_change_rate']*100}
+    for ticker in tickers.values():
+        coins[ticker.key[4:]] = {'price' : ticker.price, 'change' : ticker.change}
     coin_list = sorted(coins.items(),key = lambda x: x[1]['change'],reverse=True)
     
     for item in coin_list:
@@ -126,52 +128,62 @@ def get_upbit_all(chat: ChatContext):
     
     chat.reply(result)
 
-def get_upbit_korean(query):
-    res_eng_query = requests.get(all_url)
-    for market in res_eng_query.json():
-        if 'KRW' in market['market'] and query in market['korean_name']:
-            eng_query = market['market']
-            if query == market['korean_name']:
-                break
-
-    res = requests.get(base_url + eng_query)
-    return (res.json()[0],eng_query[4:])
-
-
+@command("!바낸", shared=True)
 def get_binance(chat: ChatContext):
     try:
-        query = chat.message.param.upper()
-        query_split = query.split("/")
-        query = "".join(query_split)
-        currency = get_USDKRW()
-        r = requests.get(binance_url+'24hr').json()
-        is_USDT = query_split[1] in ["USDT", "BUSD", "USDC"]
-        for coin in r:
-            if coin['symbol'] == 'BTCUSDT':
-                BTCUSDT = float(coin['lastPrice'])
-                if query == 'BTCUSDT':
-                    price = BTCUSDT
-                    change = float(coin['priceChangePercent'])
-            elif coin['symbol'] == query:
-                price = float(coin['lastPrice'])
-                change = float(coin['priceChangePercent'])
-            elif coin['symbol'] == query_split[1]+'USDT':
-                to_USDT = float(coin['lastPrice'])
-        if not is_USDT:
-            price = price*to_USDT
-        BTCKRW = requests.get(base_url + "KRW-BTC").json()[0]["trade_price"]
+        base, quote = chat.message.param.upper().replace(" ", "").split("/")
+        symbols, markets = pair_symbols(base, quote)
+        sources = gather({
+            "바낸": Source(lambda: binance_tickers.get_many(symbols), lambda: peek_any(binance_tickers, symbols)),
+            "업비트": Source(lambda: upbit_tickers.get_many(markets), lambda: peek_any(upbit_tickers, markets)),
+        })
+        conversion = conversion_graph.convert(base, quote)
+        to_usdt = conversion_graph.convert(base, "USDT")
+        btc_usdt = conversion_graph.convert("BTC", "USDT")
+        btc_krw = conversion_graph.convert("BTC", "KRW")
+        if None in (conversion, to_usdt, btc_usdt, btc_krw):
+            raise LookupError(f"{base}/{quote} 경로가 없습니다")
+        fx = fx_rate.get()
+        currency = fx.value
+        price = to_usdt.rate
         query_KRW = price*currency
-        query_KRW_kimp = (BTCKRW/(BTCUSDT*currency))*query_KRW
-        res = f'{query}\nUSD : ${price:,f}\nKRW : ￦{query_KRW:,.2f}\nKRW(김프) : ￦{query_KRW_kimp:,.2f}\n등락률 : {change:+.2f}%\n환율 : ￦{currency:,.0f}'
+        query_KRW_kimp = (btc_krw.rate/(btc_usdt.rate*currency))*query_KRW
+        res = f'{base}/{quote}\n1 {base} = {format_rate(conversion.rate)} {quote}'
+        if len(conversion.path) > 2:
+            res += f'\n경로 : {" → ".join(conversion.path)}'
+        res += f'\nUSD : ${price:,f}\nKRW : ￦{query_KRW:,.2f}\nKRW(김프) : ￦{query_KRW_kimp:,.2f}'
+        direct = sources["바낸"].value.get(base + quote)
+        if direct is not None:
+            res += f'\n등락률 : {direct.change:+.2f}%'
+        used = conversion.tickers + to_usdt.tickers + btc_usdt.tickers + btc_krw.tickers
+        res += f'\n환율 : ￦{currency:,.0f} ({fx.time_string} {fx.source})\n({format_age(used)})' + stale_note(sources)
         chat.reply(res)
     except Exception as e:
         print(e)
-        chat.reply('코인이 정확하지 않거나 오류가 발생하였습니다. 코인심볼과 화폐단위를 함께 적어주세요. 예시 : BTC/USDT, ETC/USDT, IQ/BNB')
+        chat.reply('코인이 정확하지 않거나 오류가 발생하였습니다. 코인심볼과 화폐단위를 함께 적어주세요. 예시 : BTC/USDT, ETH/KRW, IQ/BNB')
+
+def peek_any(tickers, keys):
+    """늦을 때 쓸 마지막 시세. 하나도 없으면 None"""
+    found = {key: tickers.peek(key) for key in keys if tickers.peek(key) is not None}
+    return found or None
 
+@command("!김프", shared=True)
 def get_kimchi_premium(chat: ChatContext):
-    BTCUSDT = float(requests.get(binance_url+"price?symbol=BTCUSDT").json()["price"])
-    BTCKRW = requests.get(base_url + "KRW-BTC").json()[0]["trade_price"]
-    USDKRW = get_USDKRW()
+    try:
+        sources = gather({
+            "바낸": Source(lambda: binance_tickers.get("BTCUSDT"), lambda: binance_tickers.peek("BTCUSDT")),
+            "업비트": Source(lambda: upbit_tickers.get("KRW-BTC"), lambda: upbit_tickers.peek("KRW-BTC")),
+        })
+        fx = fx_rate.get()
+    except LookupError as e:
+        print(e)
+        chat.reply("시세를 가져오지 못했습니다. 잠시 후 다시 시도하세요.")
+        return None
+    BTCUSDT_ticker = sources["바낸"].value
+    BTCUSDT = BTCUSDT_ticker.price
+    BTCKRW_ticker = sources["업비트"].value
+    BTCKRW = BTCKRW_ticker.price
+    USDKRW = fx.value
     local_time = datetime.datetime.now()
     eastern = pytz.timezone('US/Eastern')
     eastern_time = local_time.astimezone(eastern)
@@ -180,17 +192,38 @@ def get_kimchi_premium(chat: ChatContext):
     BTCKRW_to_USDT = BTCKRW/USDKRW
     kimchi_premium = (BTCKRW - BTCUSDT_to_KRW) / BTCUSDT_to_KRW * 100
 
-    chat.reply(f'김치 프리미엄\n업빗 : ￦{BTCKRW:,.0f}(${BTCKRW_to_USDT:,.0f})\n바낸 : ￦{BTCUSDT_to_KRW:,.0f}(${BTCUSDT:,.0f})\n김프 : {kimchi_premium:.2f}%\n환율 : ￦{USDKRW:,.0f}\n버거시간(동부) : {EST}')
+    chat.reply(f'김치 프리미엄\n업빗 : ￦{BTCKRW:,.0f}(${BTCKRW_to_USDT:,.0f})\n바낸 : ￦{BTCUSDT_to_KRW:,.0f}(${BTCUSDT:,.0f})\n김프 : {kimchi_premium:.2f}%\n환율 : ￦{USDKRW:,.0f} ({fx.time_string} {fx.source})\n버거시간(동부) : {EST}\n(바낸 {format_age([BTCUSDT_ticker])}, 업비트 {format_age([BTCKRW_ticker])})' + stale_note(sources))
 
+@command("!김프차트", cost="cpu", shared=True)
+def get_kimchi_chart(chat: ChatContext):
+    period = chat.message.param.strip() if chat.message.has_param else "24h"
+    seconds = parse_duration(period)
+    if not seconds:
+        chat.reply('"!김프차트 기간"으로 입력하세요. (예: !김프차트 24h, !김프차트 6시간, !김프차트 7d)')
+        return None
+    seconds = min(seconds, kimchi_sampler.capacity * kimchi_sampler.interval)
+    samples = kimchi_sampler.window(seconds)
+    if len(samples) < 2:
+        chat.reply("아직 기록된 김프가 부족합니다. 잠시 후 다시 시도하세요.")
+        return None
+    chat.reply_media([io.BytesIO(render_chart(samples, f"김치 프리미엄 ({period})"))])
+
+@command("!달러", shared=True)
 def usd_to_krw(chat: ChatContext):
     usd = float(chat.message.param)
-    USDKRW = get_USDKRW()
-    chat.reply(f'${usd:,.2f} = {USDKRW*float(chat.message.msg[4:]):,.2f}원\n환율 : {USDKRW:,.2f}원')
+    fx = fx_rate.get()
+    USDKRW = fx.value
+    chat.reply(f'${usd:,.2f} = {USDKRW*float(chat.message.msg[4:]):,.2f}원\n환율 : {USDKRW:,.2f}원 ({fx.time_string} {fx.source})')
 
-def get_USDKRW():
-    USDKRW = float(requests.get(currency_url).json()["country"][1]["value"].replace(",",""))
-    return USDKRW
+def stale_note(sources):
+    stale = [name for name, result in sources.items() if result.stale]
+    if fx_rate.stale:
+        stale.append("환율")
+    if not stale:
+        return ""
+    return f'\n※ {", ".join(stale)} 응답이 늦어 마지막 값을 사용했습니다'
 
+@command("!코인등록")
 def coin_add(chat: ChatContext):
     msg_split = chat.message.msg.split(" ")
     if not len(msg_split) == 4:
@@ -199,23 +232,19 @@ def coin_add(chat: ChatContext):
     symbol = msg_split[1].upper()
     amount = float(msg_split[2].replace(',',''))
     average = float(msg_split[3].replace(',',''))
-    r = requests.get(base_url + 'KRW-' + symbol)
-    if 'error' in r.text:
+    if not market_catalog.has('KRW-' + symbol):
         chat.reply('업비트 원화마켓만 지원합니다.\n"!코인등록 코인명(영문심볼) 보유수량 평균단가"로 입력하세요.')
         return None
 
-    kv = PyKV()
-    user_kv = kv.get(f"coin.{str(chat.sender.id)}")
-    if not user_kv:
-        user_kv = {}
-    
-    user_kv[symbol] = {"amount":amount, "average":average}
-    kv.put(f"coin.{str(chat.sender.id)}",user_kv)
+    portfolio = load_portfolio(chat.sender.id)
+    portfolio.set(symbol, amount, average)
+    save_portfolio(chat.sender.id, portfolio)
+    register_room_member(chat.room.id, chat.sender.id, chat.sender.name)
 
     chat.reply(f'{symbol}코인을 {average}원에 {amount}개 등록하였습니다.')
 
+@command("!코인삭제")
 def coin_remove(chat: ChatContext):
-    kv = PyKV()
     msg_split = chat.message.msg.split(" ")
     if not len(msg_split) == 2:
         chat.reply('"!코인삭제 코인명(영문심볼)"으로 입력하세요.')
@@ -223,13 +252,57 @@ def coin_remove(chat: ChatContext):
     
     symbol = msg_split[1].upper()
     
-    user_kv = kv.get(f"coin.{str(chat.sender.id)}")
-    if not user_kv:
-        user_kv = {}
+    portfolio = load_portfolio(chat.sender.id)
     
-    if symbol in user_kv.keys():
-        user_kv.pop(symbol)
-        kv.put(f"coin.{str(chat.sender.id)}", user_kv)
+    if portfolio.remove(symbol):
+        save_portfolio(chat.sender.id, portfolio)
         chat.reply(f'{symbol}코인을 삭제하였습니다.')
     else:
-        chat.reply('코인이 없거나 잘못된 명령입니다.\n"!코인삭제 코인명(영문심볼)"으로 입력하세요.')
\ No newline at end of file
+        chat.reply('코인이 없거나 잘못된 명령입니다.\n"!코인삭제 코인명(영문심볼)"으로 입력하세요.')
+
+ALERT_USAGE = '"!알림등록 코인명 가격"으로 입력하세요. (예: !알림등록 BTC 1억, !알림등록 이더리움 450만)'
+
+@command("!알림등록")
+def alert_add(chat: ChatContext):
+    words = chat.message.param.split(maxsplit=1) if chat.message.has_param else []
+    if len(words) != 2:
+        chat.reply(ALERT_USAGE)
+        return None
+    market = market_catalog.resolve(words[0])
+    threshold = parse_price(words[1])
+    if market is None or threshold is None:
+        chat.reply('코인이나 가격이 올바르지 않습니다.\n' + ALERT_USAGE)
+        return None
+
+    alert_engine.start(chat.api.iris_endpoint)
+    if len(alert_engine.user_alerts(chat.sender.id)) >= ALERT_LIMIT:
+        chat.reply(f'알림은 {ALERT_LIMIT}개까지 등록할 수 있습니다. !알림삭제 번호 로 정리하세요.')
+        return None
+    ticker = upbit_tickers.get(market.market)
+    if ticker is None:
+        chat.reply("시세를 가져오지 못했습니다.")
+        return None
+
+    alert = alert_engine.add(chat.sender.id, chat.sender.name, chat.room.id, market.market, threshold, ticker.price)
+    chat.reply(f'[{alert.id}] {alert.describe()} 알림을 등록하였습니다.\n현재가 : {format_price(ticker.price)}')
+
+@command("!알림목록")
+def alert_list(chat: ChatContext):
+    alert_engine.start(chat.api.iris_endpoint)
+    alerts = alert_engine.user_alerts(chat.sender.id)
+    if not alerts:
+        chat.reply('등록된 알림이 없습니다.\n' + ALERT_USAGE)
+        return None
+    chat.reply('내 가격 알림\n' + '\n'.join(f'[{alert.id}] {alert.describe()}' for alert in alerts))
+
+@command("!알림삭제")
+def alert_remove(chat: ChatContext):
+    alert_engine.start(chat.api.iris_endpoint)
+    if not chat.message.has_param or not chat.message.param.strip().isdigit():
+        chat.reply('"!알림삭제 번호"로 입력하세요. 번호는 !알림목록 에서 확인할 수 있습니다.')
+        return None
+    alert = alert_engine.remove(chat.sender.id, int(chat.message.param.strip()))
+    if alert is None:
+        chat.reply('내 알림 중에 그 번호가 없습니다.')
+    else:
+        chat.reply(f'[{alert.id}] {alert.describe()} 알림을 삭제하였습니다.')
\ No newline at end of file
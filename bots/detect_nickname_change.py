@@ -1,75 +1,168 @@
-import time, datetime
-from iris import PyKV, Bot
-import pytz
+import hashlib
+import time
+from iris import ChatContext, PyKV, Bot
+from helper.CommandRouter import command
+from helper.NicknameStore import NicknameEntry, nickname_store, now
 
 detect_rooms = ["18398338829933617"]
-refresh_second = 3
+refresh_second = 3          # 변경이 감지된 직후 폴링 간격
+max_refresh_second = 30     # 변경이 없으면 이 값까지 폴링 간격을 늘림
+backoff_rate = 1.5
+
+member_query = "select enc,nickname,user_id,involved_chat_id from db2.open_chat_member"
+# 변경 여부만 확인하는 한 줄짜리 요약: (user_id, 방, 닉네임)을 전부 이어 붙인 문자열
+# 멤버마다 행을 받는 것보다 훨씬 작고, 해시만 들고 있다가 비교하므로 놓치는 변경이 없음
+fingerprint_query = """
+select count(*) as cnt,
+       group_concat(user_id || ':' || involved_chat_id || ':' || nickname, char(31)) as members
+from (select user_id, involved_chat_id, nickname from db2.open_chat_member order by user_id, involved_chat_id)
+"""
 
 def detect_nickname_change(base_url):
     bot = Bot(base_url)
-    kv = PyKV()
-    query = "select enc,nickname,user_id,involved_chat_id from db2.open_chat_member"
-    history = kv.get('user_history')
-    members = {}
-    
-    if not history:
-        query_result = bot.api.query(query=query, bind=[])
-        history = {}
-        for member in query_result:
-            history[member['user_id']] = {"history": [{
-                "nickname":member["nickname"],
-                "involved_chat_id":member["involved_chat_id"],
-                "date":""
-            }]
-            }
-        kv.put('user_history',history)
-    
+    nickname_store.migrate_kv(PyKV())
+
+    snapshot = None
+    fingerprint = None
+    interval = refresh_second
+
     while True:
         try:
-            changed = False
-            query_result = bot.api.query(query=query, bind=[])
-            members = {}
-            for member in query_result:
-                members[member['user_id']] = {"nickname":member["nickname"],"involved_chat_id":member["involved_chat_id"]}
-            
-            for user_id in members.keys():
-                if user_id not in history.keys():
-                    history[user_id] = {"history" : [{
-                        "nickname":members[user_id]["nickname"],
-                        "involved_chat_id":members[user_id]["involved_chat_id"],
-                        "date": ""
-                    }]
-                    }
+            current = member_fingerprint(bot)
+
+            if current == fingerprint:
+                interval = min(interval * backoff_rate, max_refresh_second)
+            else:
+                snapshot, changed_members = scan_members(bot, snapshot)
+                fingerprint = current
+
+                if apply_changes(bot, nickname_store, changed_members):
+                    interval = refresh_second
                 else:
-                    if members[user_id]["nickname"] != history[user_id]["history"][-1]["nickname"]:
-                        korean = pytz.timezone('Asia/Seoul')
-                        time_string = datetime.datetime.now(korean).strftime("%y%m%d %H:%M")
-                        history[user_id]["history"].append(
-                            {
-                                "nickname":members[user_id]["nickname"],
-                                "involved_chat_id":members[user_id]["involved_chat_id"],
-                                "date":time_string
-                            }
-                        )
-                        
-                        if members[user_id]["involved_chat_id"] in detect_rooms:
-                            user_history = []
-                            for change in history[user_id]["history"]:
-                                user_history.append(f"ㄴ{'[' + change['date'] + ']' if not change['date'] == '' else ''} {change['nickname']}")
-                            
-                            user_history.reverse()
-                            history_string = "\n".join(user_history)
-                            
-                            message = f"닉네임이 변경되었어요!\n{history[user_id]['history'][-2]['nickname']} -> {members[user_id]['nickname']}\n" + "\u200b"*600 + "\n" + history_string
-                            
-                            bot.api.reply(int(members[user_id]["involved_chat_id"]),message.strip())
-                            changed = True
-                
-            if changed:
-                kv.put('user_history',history)
+                    interval = min(interval * backoff_rate, max_refresh_second)
 
         except Exception as e:
             print("something went wrong")
             print(e)
-        
-        time.sleep(refresh_second)
\ No newline at end of file
+
+        time.sleep(interval)
+
+def member_fingerprint(bot):
+    """모든 멤버의 (user_id, 방, 닉네임)을 덮는 해시. 한 명의 닉네임이라도 바뀌면 달라집니다."""
+    row = bot.api.query(query=fingerprint_query, bind=[])[0]
+    return row["cnt"], hashlib.sha1(str(row["members"]).encode()).hexdigest()
+
+def scan_members(bot, snapshot):
+    """
+    멤버 목록을 받아서 (user_id, 방) -> 닉네임 해시 스냅샷과 비교합니다.
+    바뀐 행만 돌려주고, 첫 스캔(snapshot이 None)이면 모든 행을 돌려줍니다.
+    """
+    query_result = bot.api.query(query=member_query, bind=[])
+    new_snapshot = {}
+    changed_members = []
+    for member in query_result:
+        key = (member["user_id"], member["involved_chat_id"])
+        digest = hash(member["nickname"])
+        new_snapshot[key] = digest
+        if snapshot is None or snapshot.get(key) != digest:
+            changed_members.append(member)
+    return new_snapshot, changed_members
+
+def apply_changes(bot, store, changed_members):
+    """
+    바뀐 행을 닉네임 기록에 추가합니다. 닉네임 변경이 있었으면 True
+
+    오픈채팅은 방마다 프로필 이름이 다를 수 있어서 같은 (user_id, 방)의 마지막 기록과 비교합니다.
+    """
+    changed = False
+    first_seen = []
+    for member in changed_members:
+        user_id = str(member["user_id"])
+        chat_id = str(member["involved_chat_id"])
+        latest = store.latest(user_id, chat_id)
+        if latest is None:
+            first_seen.append(NicknameEntry(user_id, chat_id, member["nickname"], None))
+        elif member["nickname"] != latest.nickname:
+            store.append(user_id, chat_id, member["nickname"], now())
+            changed = True
+
+            if member["involved_chat_id"] in detect_rooms:
+                user_history = []
+                for change in store.history(user_id, chat_id):
+                    user_history.append(f"ㄴ{'[' + change.date + ']' if not change.date == '' else ''} {change.nickname}")
+
+                user_history.reverse()
+                history_string = "\n".join(user_history)
+
+                message = f"닉네임이 변경되었어요!\n{latest.nickname} -> {member['nickname']}\n" + "\u200b"*600 + "\n" + history_string
+
+                bot.api.reply(int(member["involved_chat_id"]),message.strip())
+
+    store.append_many(first_seen)
+    return changed
+
+NICKNAME_PAGE_SIZE = 10
+NICKNAME_USAGE = "사용법: 답장하여 !닉변 [페이지] 또는 !닉변 <닉네임> [페이지]"
+
+@command("!닉변")
+def nickname_history_command(chat: ChatContext):
+    """답장한 사람 또는 그 닉네임을 썼던 사람의 닉네임 기록을 보여줍니다."""
+    words = chat.message.param.split() if chat.message.has_param else []
+    page = 1
+    if words and words[-1].isdigit() and (len(words) > 1 or is_reply_message(chat)):
+        page = max(int(words.pop()), 1)
+    name = " ".join(words)
+
+    if not name:
+        if not is_reply_message(chat):
+            chat.reply(NICKNAME_USAGE)
+            return
+        source = chat.get_source()
+        chat.reply(format_user_history(source.sender.id, source.sender.name, page))
+        return
+
+    users, total = nickname_store.find_users(name, page, NICKNAME_PAGE_SIZE)
+    if total == 0:
+        users, total = nickname_store.find_users(name, page, NICKNAME_PAGE_SIZE, prefix=True)
+    if total == 0:
+        chat.reply(f"[{name}] 닉네임 기록이 없습니다.")
+        return
+    if total == 1 and page == 1:
+        latest = nickname_store.latest(users[0].user_id)
+        chat.reply(format_user_history(users[0].user_id, latest.nickname, 1))
+        return
+
+    chat.reply(format_user_list(name, users, total, page))
+
+def is_reply_message(chat: ChatContext) -> bool:
+    return chat.message.type == 26 or bool(chat.message.attachment.get("src_isThread"))
+
+def page_count(total: int) -> int:
+    return max((total + NICKNAME_PAGE_SIZE - 1) // NICKNAME_PAGE_SIZE, 1)
+
+def format_user_history(user_id, name: str, page: int) -> str:
+    entries, total = nickname_store.history_page(user_id, page, NICKNAME_PAGE_SIZE)
+    if total == 0:
+        return f"[{name}]님의 닉네임 기록이 없습니다."
+    if not entries:
+        return f"페이지가 없습니다. (전체 {page_count(total)}페이지)"
+
+    lines = [f"ㄴ{'[' + entry.date + ']' if not entry.date == '' else ''} {entry.nickname}" for entry in entries]
+    return f"[{name}]님의 닉네임 기록 ({page}/{page_count(total)}, {total}건)\n" + "\u200b"*600 + "\n" + "\n".join(lines)
+
+def format_user_list(name: str, users, total: int, page: int) -> str:
+    if not users:
+        return f"페이지가 없습니다. (전체 {page_count(total)}페이지)"
+
+    lines = []
+    for index, user in enumerate(users, start=(page - 1) * NICKNAME_PAGE_SIZE + 1):
+        latest = nickname_store.latest(user.user_id)
+        current = latest.nickname if latest else user.nickname
+        used = f" [{user.date}]" if user.date else ""
+        lines.append(f"{index}. {current} (←{user.nickname}{used})")
+
+    return (
+        f"[{name}] 닉네임을 쓴 사람 {total}명 ({page}/{page_count(total)})\n"
+        "한 사람의 기록은 그 사람 메세지에 답장하여 !닉변\n"
+        + "\u200b"*600 + "\n" + "\n".join(lines)
+    )
@@ -5,6 +5,7 @@ from io import BytesIO
 import requests
 from iris.decorators import *
 from iris import ChatContext
+from helper.CommandRouter import command
 import os, io
 import time
 
@@ -33,17 +34,7 @@ safety_settings=[
     ),
 ]
 
-def get_gemini(chat: ChatContext):
-    match chat.message.command:
-        case "!gi":
-            get_gemini_image(chat)
-
-        case "!i2i":
-            get_gemini_image_to_image(chat)
-        
-        case "!분석":
-            get_gemini_vision_analyze_image_reply(chat)
-
+@command("!gi", cost="network")
 @has_param
 def get_gemini_image(chat : ChatContext):
     try:
@@ -102,6 +93,7 @@ def get_gemini_image(chat : ChatContext):
             f"Q: {chat.message.msg[4:]}"
         )
 
+@command("!i2i", cost="network")
 @is_reply
 @has_param
 def get_gemini_image_to_image(chat : ChatContext):
@@ -164,6 +156,7 @@ def get_gemini_image_to_image(chat : ChatContext):
             f"Q: {chat.message.param}"
         )
 
+@command("!분석", cost="network")
 @is_reply
 def get_gemini_vision_analyze_image_reply(chat: ChatContext):
     src_chat = chat.get_source()
@@ -4,10 +4,12 @@ from gemini_webapi import GeminiClient
 import time
 from iris.decorators import *
 import os
+from helper.CommandRouter import command
 
 Secure_1PSID = os.getenv("SECURE_1PSID")
 Secure_1PSIDTS = os.getenv("SECURE_1PSIDTS")
 
+@command("!ig", cost="network")
 @has_param
 def get_imagen(chat: ChatContext):
     images = asyncio.run(get_client(chat.message.param))
@@ -1,8 +1,13 @@
 """
 카카오톡 리액션(공감) 기능 모듈
 """
-import requests
+from helper.HttpClient import http
 import time
+from helper.CommandRouter import command
+from helper.IrisAuth import get_provider
+from helper.RoomInfo import get_room_meta
+
+REACT_USAGE = "사용법: !react [숫자]\n0:취소, 1:하트, 2:좋아요, 3:체크, 4:웃음, 5:놀람, 6:슬픔"
 
 
 class KakaoReaction:
@@ -24,34 +29,10 @@ class KakaoReaction:
         """
         self.iris_url = iris_url
         self.base_url = "https://talk-pilsner.kakao.com"
-        self._authorization = None
+        self.auth = get_provider(iris_url)
     
-    def _get_auth_info(self):
-        """Iris API에서 AOT 정보 가져오기"""
-        if self._authorization:
-            return self._authorization
-            
-        try:
-            response = requests.get(f"{self.iris_url}/aot")
-            data = response.json()
-            
-            if data.get("success"):
-                aot = data.get("aot", {})
-                access_token = aot.get("access_token")
-                device_uuid = aot.get("d_id")
-                self._authorization = f"{access_token}-{device_uuid}"
-                return self._authorization
-        except Exception as e:
-            print(f"[KakaoReaction] Failed to get auth info: {e}")
-        
-        return None
-    
-    def _get_headers(self):
+    def _get_headers(self, auth):
         """API 요청 헤더 생성"""
-        auth = self._get_auth_info()
-        if not auth:
-            return None
-            
         return {
             'Authorization': auth,
             'talk-agent': 'android/11.0.0',
@@ -74,11 +55,6 @@ class KakaoReaction:
             bool: 성공 여부
         """
         try:
-            headers = self._get_headers()
-            if not headers:
-                print("[KakaoReaction] Headers is None")
-                return False
-            
             url = f"{self.base_url}/messaging/chats/{channel_id}/bubble/reactions"
             
             # reqId 생성 (현재 시간을 밀리초로)
@@ -96,7 +72,14 @@ class KakaoReaction:
             
             print(f"[KakaoReaction] Payload: {payload}")
             
-            response = requests.post(url, json=payload, headers=headers)
+            # 캐시된 토큰 사용, 인증 오류면 한 번 갱신 후 재시도
+            response = self.auth.request(
+                lambda auth: http.post(url, json=payload, headers=self._get_headers(auth))
+            )
+            
+            if response is None:
+                print("[KakaoReaction] Failed to get auth info")
+                return False
             
             if response.status_code == 200:
                 print(f"[KakaoReaction] Success!")
@@ -124,19 +107,19 @@ def get_link_id(iris_url, chat_id):
     Returns:
         str or None: 링크 ID
     """
-    try:
-        # chat_rooms 테이블에서 직접 link_id 조회
-        query = "SELECT id, link_id, type FROM chat_rooms WHERE id = ?"
-        result = requests.post(
+    def query(sql, bind):
+        return http.post(
             f"{iris_url}/query",
-            json={"query": query, "bind": [str(chat_id)]}
-        ).json()
+            json={"query": sql, "bind": bind}
+        ).json().get("data", [])
+    
+    try:
+        # chat_rooms 조회 결과는 방 메타데이터 캐시에 보관
+        room_meta = get_room_meta(chat_id, query)
         
-        if result.get("data") and len(result["data"]) > 0:
-            link_id = result["data"][0].get("link_id")
-            if link_id:
-                print(f"[KakaoReaction] Found link_id: {link_id}")
-                return link_id
+        if room_meta and room_meta.link_id:
+            print(f"[KakaoReaction] Found link_id: {room_meta.link_id}")
+            return room_meta.link_id
         
         print(f"[KakaoReaction] No link_id found - not an open chat")
         return None
@@ -181,4 +164,26 @@ def add_reaction_to_message(chat, reaction_type, reactor, iris_url):
         import traceback
         print(f"[KakaoReaction] add_reaction error: {e}")
         traceback.print_exc()
-        return False
\ No newline at end of file
+        return False
+
+
+@command("!react", inject=("reactor",))
+def react_command(chat, reactor):
+    """!react 숫자 형태로 리액션 추가"""
+    try:
+        reaction_num = chat.message.msg[7:].strip()
+        
+        if not reaction_num:
+            chat.reply(REACT_USAGE)
+            return
+        
+        reaction_type = int(reaction_num)
+        
+        # 리액션 추가
+        add_reaction_to_message(chat, reaction_type, reactor, reactor.iris_url)
+        
+    except ValueError:
+        chat.reply("숫자를 입력하세요!\n" + REACT_USAGE)
+    except Exception as e:
+        print(f"React error: {e}")
+        chat.reply("리액션 추가 중 오류가 발생했습니다.")
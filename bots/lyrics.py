@@ -1,12 +1,14 @@
-import requests
+from helper.HttpClient import http
 import urllib.parse
 from iris import ChatContext
+from helper.CommandRouter import command
 
+@command("!가사찾기", cost="network", shared=True)
 def find_lyrics(chat: ChatContext):
     try:
         query = urllib.parse.quote_plus(chat.message.msg[6:])
         url = f"https://apis.naver.com/vibeWeb/musicapiweb/v4/search/lyric?query={query}&start=1&display=10&sort=RELEVANCE"
-        r = requests.get(
+        r = http.get(
                 url,
                 headers={'Accept': 'application/json'}
                 ).json()
@@ -16,18 +18,19 @@ def find_lyrics(chat: ChatContext):
     except:
         chat.reply("검색된 노래가 없습니다.")
 
+@command("!노래가사", cost="network", shared=True)
 def get_lyrics(chat: ChatContext):
     try:
         query = urllib.parse.quote_plus(chat.message.msg[6:])
         url = f"https://apis.naver.com/vibeWeb/musicapiweb/v4/searchall?query={query}&sort=RELEVANCE&vidDisplay=25&trDisplay=9&alDisplay=21&arDisplay=21"
-        r = requests.get(
+        r = http.get(
                 url,
                 headers={'Accept': 'application/json'}
                 ).json()
         track = r["response"]["result"]["trackResult"]["tracks"][0]
         res = f'{track["artists"][0]["artistName"]} - {track["trackTitle"]}\n' + "\u200b"*500 + "\n"
         track_url = f'https://apis.naver.com/vibeWeb/musicapiweb/vibe/v4/lyric/{track["trackId"]}'
-        r2 = requests.get(
+        r2 = http.get(
                 track_url,
                 headers={'Accept': 'application/json'}
                 ).json()
@@ -1,44 +1,19 @@
-import requests
+from helper.HttpClient import http
 import json
 from iris import ChatContext
 from iris.decorators import *
+from helper.CommandRouter import command
+from helper.IrisAuth import get_provider
+from helper.Cache import TTLCache
 import os
 
 ALLSEE = '\u200b' * 500
 TALK_API_URL = os.getenv("TALK_API_URL") or "https://talk-api.naijun.dev/api/v1/send"
 
-def get_auth_from_iris(iris_endpoint: str):
-    """Iris에서 AOT 토큰 정보를 가져옵니다."""
-    try:
-        print(f"[DEBUG] Iris endpoint: {iris_endpoint}")
-        aot_url = f"{iris_endpoint}/aot"
-        print(f"[DEBUG] Requesting AOT from: {aot_url}")
-        
-        response = requests.get(aot_url)
-        print(f"[DEBUG] AOT response status: {response.status_code}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            print(f"[DEBUG] AOT data received: {data}")
-            
-            if data.get("success"):
-                aot_data = data.get("aot", {})
-                access_token = aot_data.get("access_token")
-                device_uuid = aot_data.get("d_id")
-                
-                if not access_token or not device_uuid:
-                    print(f"[ERROR] Missing access_token or d_id")
-                    return None
-                
-                auth = f"{access_token}-{device_uuid}"
-                print(f"[DEBUG] Auth header created: {auth[:30]}...{auth[-20:]}")
-                return auth
-        return None
-    except Exception as e:
-        print(f"[ERROR] Error getting auth from Iris: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+# 방장 조회 IN 쿼리 한 번에 넣을 멤버 수 (SQLite 바인드 변수 제한 999 이하)
+MEMBER_QUERY_CHUNK = 500
+# 방 ID -> {"id", "name"}, 입장/퇴장 이벤트에서 무효화
+room_master_cache = TTLCache(ttl=int(os.getenv("ROOM_MASTER_TTL") or 3600), maxsize=1024)
 
 def get_room_master_from_db(chat: ChatContext):
     """데이터베이스에서 방장 ID를 조회합니다 (link_member_type = 1)."""
@@ -46,59 +21,18 @@ def get_room_master_from_db(chat: ChatContext):
         room_id = chat.room.id
         print(f"[DEBUG] Getting room master from DB for room_id: {room_id}")
         
-        # 1. chat_rooms에서 active_member_ids 컬럼 가져오기
-        query = "SELECT active_member_ids FROM chat_rooms WHERE id = ?"
-        results = chat.api.query(query, [room_id])
-        
-        print(f"[DEBUG] chat_rooms query results: {results}")
-        
-        if not results or len(results) == 0:
-            print(f"[DEBUG] Room not found in chat_rooms")
-            return None
-        
-        members_data = results[0].get("active_member_ids")
-        print(f"[DEBUG] active_member_ids data: {members_data}")
-        
-        if not members_data:
-            print(f"[DEBUG] No active_member_ids data found")
-            return None
-        
-        # 2. active_member_ids 데이터 파싱 (JSON 배열 형식)
-        try:
-            member_ids = json.loads(members_data)
-            print(f"[DEBUG] Parsed member IDs: {member_ids}")
-        except:
-            # JSON이 아니면 쉼표로 구분된 문자열일 수도 있음
-            member_ids = [m.strip() for m in members_data.split(",")]
-            print(f"[DEBUG] Parsed member IDs (as CSV): {member_ids}")
-        
-        # 3. 각 멤버를 open_chat_member에서 조회하여 link_member_type = 1인 사람 찾기
-        for member_id in member_ids:
-            try:
-                print(f"[DEBUG] Checking member: {member_id}")
-                
-                member_query = "SELECT user_id, nickname, enc, link_member_type FROM open_chat_member WHERE user_id = ?"
-                member_results = chat.api.query(member_query, [member_id])
-                
-                print(f"[DEBUG] Member query result for {member_id}: {member_results}")
-                
-                if member_results and len(member_results) > 0:
-                    member_type = member_results[0].get("link_member_type")
-                    print(f"[DEBUG] User {member_id} has link_member_type: {member_type}")
-                    
-                    # link_member_type이 1 또는 "1"이면 방장
-                    if str(member_type) == "1":
-                        master_id = member_results[0].get("user_id")
-                        master_name = member_results[0].get("nickname")
-                        print(f"[DEBUG] Room master found in DB: {master_name} ({master_id})")
-                        return {"id": int(master_id), "name": master_name}
-            
-            except Exception as e:
-                print(f"[DEBUG] Error checking member {member_id}: {e}")
-                continue
+        # 1. 이 방의 방장을 바로 조회
+        query = "SELECT user_id, nickname, enc, link_member_type FROM open_chat_member WHERE involved_chat_id = ? AND link_member_type = 1 LIMIT 1"
+        results = chat.api.query(query, [str(room_id)])
         
-        print(f"[DEBUG] No HOST found in active_member_ids")
-        return None
+        if results:
+            master = results[0]
+            print(f"[DEBUG] Room master found in DB: {master.get('nickname')} ({master.get('user_id')})")
+            return {"id": int(master.get("user_id")), "name": master.get("nickname")}
+        
+        # 2. 못 찾으면 active_member_ids를 묶음 단위 IN 쿼리로 조회
+        print(f"[DEBUG] No host row for room, falling back to active_member_ids")
+        return get_room_master_from_active_members(chat)
             
     except Exception as e:
         print(f"[ERROR] Error getting room master from DB: {e}")
@@ -106,6 +40,47 @@ def get_room_master_from_db(chat: ChatContext):
         traceback.print_exc()
         return None
 
+def get_room_master_from_active_members(chat: ChatContext):
+    """chat_rooms.active_member_ids 중 link_member_type = 1인 멤버를 찾습니다."""
+    query = "SELECT active_member_ids FROM chat_rooms WHERE id = ?"
+    results = chat.api.query(query, [chat.room.id])
+    
+    if not results or not results[0].get("active_member_ids"):
+        print(f"[DEBUG] No active_member_ids data found")
+        return None
+    
+    members_data = results[0].get("active_member_ids")
+    
+    # active_member_ids 데이터 파싱 (JSON 배열 형식)
+    try:
+        member_ids = json.loads(members_data)
+    except:
+        # JSON이 아니면 쉼표로 구분된 문자열일 수도 있음
+        member_ids = [m.strip() for m in members_data.split(",")]
+    
+    print(f"[DEBUG] Checking {len(member_ids)} members in chunks of {MEMBER_QUERY_CHUNK}")
+    
+    # 멤버마다 쿼리하지 않고 SQLite 바인드 변수 제한 안에서 묶어서 조회
+    for i in range(0, len(member_ids), MEMBER_QUERY_CHUNK):
+        chunk = [str(member_id) for member_id in member_ids[i:i + MEMBER_QUERY_CHUNK]]
+        placeholders = ",".join("?" * len(chunk))
+        # open_chat_member는 (사용자, 오픈채팅)마다 한 줄이라 이 방 행만 봐야 다른 방 방장이 섞이지 않습니다
+        member_query = f"SELECT user_id, nickname, enc, link_member_type FROM open_chat_member WHERE involved_chat_id = ? AND link_member_type = 1 AND user_id IN ({placeholders}) LIMIT 1"
+        member_results = chat.api.query(member_query, [str(chat.room.id)] + chunk)
+        
+        if member_results:
+            master_id = member_results[0].get("user_id")
+            master_name = member_results[0].get("nickname")
+            print(f"[DEBUG] Room master found in DB: {master_name} ({master_id})")
+            return {"id": int(master_id), "name": master_name}
+    
+    print(f"[DEBUG] No HOST found in active_member_ids")
+    return None
+
+def invalidate_room_master(room_id):
+    """입장/퇴장 이벤트에서 호출해서 캐시된 방장 정보를 버립니다."""
+    room_master_cache.invalidate(room_id)
+
 def get_room_master_from_members(chat: ChatContext):
     """채팅방 멤버 리스트에서 방장을 찾습니다."""
     try:
@@ -137,58 +112,68 @@ def send_mention_message(chat: ChatContext, user_id: int, user_name: str, messag
     """
     멘션 메시지를 전송하는 헬퍼 함수
     """
+    print(f"[DEBUG] send_mention_message called")
+    print(f"[DEBUG] User ID: {user_id}, Name: {user_name}, Message: {message_text}")
+    return send_mentions(chat.api.iris_endpoint, chat.room.id, [(user_id, user_name)], message_text)
+
+def send_mentions(iris_endpoint: str, room_id, users: list[tuple[int, str]], message_text: str = ""):
+    """
+    여러 사람을 멘션하는 메시지 하나를 전송합니다. 채팅 이벤트 밖(백그라운드 알림 등)에서도 쓸 수 있습니다.
+
+    Args:
+        iris_endpoint: Iris 주소
+        room_id: 보낼 채팅방 ID
+        users: (user_id, 이름) 목록
+        message_text: 멘션 뒤에 붙일 내용
+    """
     try:
-        print(f"[DEBUG] send_mention_message called")
-        print(f"[DEBUG] User ID: {user_id}, Name: {user_name}, Message: {message_text}")
-        
         if not TALK_API_URL:
             print("[ERROR] TALK_API_URL is not set")
             return False
         
-        if not user_name:
+        users = [(user_id, user_name) for user_id, user_name in users if user_name]
+        if not users:
             print("[ERROR] user_name is None")
             return False
         
-        # 메시지 구성
-        full_message = f"@{user_name} {message_text}".strip()
+        # 메시지 구성: @사용자1 @사용자2 ... 메시지
+        full_message = (" ".join(f"@{user_name}" for _, user_name in users) + f" {message_text}").strip()
         
         print(f"[DEBUG] Full message with mention: {full_message}")
         
-        # 멘션 정보 구성
-        mention_len = len(user_name)
-        attachment_obj = {
-            "mentions": [{
-                "len": mention_len,
+        # 멘션 정보 구성 (at은 메시지 전체에서 몇 번째 @ 기호인지)
+        mentions = []
+        for at, (user_id, user_name) in enumerate(users, start=1):
+            mentions.append({
+                "len": len(user_name),
                 "user_id": user_id,
-                "at": [1]
-            }]
-        }
+                "at": [at]
+            })
+        attachment_obj = {"mentions": mentions}
         
         print(f"[DEBUG] Attachment object: {attachment_obj}")
         
-        # Iris에서 인증 정보 가져오기
-        auth_header = get_auth_from_iris(chat.api.iris_endpoint)
-        
-        if not auth_header:
-            print("[ERROR] Failed to get auth header")
-            return False
-        
         # TalkApi로 메시지 전송
         payload = {
-            "chatId": chat.room.id,
+            "chatId": room_id,
             "type": 1,
             "message": full_message,
             "attachment": attachment_obj
         }
         
-        headers = {
-            "Authorization": auth_header,
-            "Content-Type": "application/json"
-        }
-        
         print(f"[DEBUG] Payload: {json.dumps(payload, ensure_ascii=False)}")
         
-        response = requests.post(TALK_API_URL, json=payload, headers=headers)
+        # Iris 인증 정보 (캐시된 토큰 사용, 인증 오류면 한 번 갱신 후 재시도)
+        response = get_provider(iris_endpoint).request(
+            lambda auth_header: http.post(TALK_API_URL, json=payload, headers={
+                "Authorization": auth_header,
+                "Content-Type": "application/json"
+            })
+        )
+        
+        if response is None:
+            print("[ERROR] Failed to get auth header")
+            return False
         
         print(f"[DEBUG] Response status: {response.status_code}")
         print(f"[DEBUG] Response body: {response.text}")
@@ -202,10 +187,11 @@ def send_mention_message(chat: ChatContext, user_id: int, user_name: str, messag
             
     except Exception as e:
         import traceback
-        print(f"[ERROR] Exception in send_mention_message: {e}")
+        print(f"[ERROR] Exception in send_mentions: {e}")
         traceback.print_exc()
         return False
 
+@command("!멘션")
 def mention_user(chat: ChatContext):
     """명령어를 입력한 사용자를 멘션합니다."""
     try:
@@ -305,13 +291,6 @@ def mention_self_and_bot(chat: ChatContext):
         
         print(f"[DEBUG] Attachment object: {attachment_obj}")
         
-        # Iris에서 인증 정보 가져오기
-        auth_header = get_auth_from_iris(chat.api.iris_endpoint)
-        
-        if not auth_header:
-            chat.reply("인증 정보를 가져올 수 없습니다.")
-            return
-        
         # TalkApi로 메시지 전송
         payload = {
             "chatId": chat.room.id,
@@ -320,14 +299,19 @@ def mention_self_and_bot(chat: ChatContext):
             "attachment": attachment_obj
         }
         
-        headers = {
-            "Authorization": auth_header,
-            "Content-Type": "application/json"
-        }
-        
         print(f"[DEBUG] Payload: {json.dumps(payload, ensure_ascii=False)}")
         
-        response = requests.post(TALK_API_URL, json=payload, headers=headers)
+        # Iris 인증 정보 (캐시된 토큰 사용, 인증 오류면 한 번 갱신 후 재시도)
+        response = get_provider(chat.api.iris_endpoint).request(
+            lambda auth_header: http.post(TALK_API_URL, json=payload, headers={
+                "Authorization": auth_header,
+                "Content-Type": "application/json"
+            })
+        )
+        
+        if response is None:
+            chat.reply("인증 정보를 가져올 수 없습니다.")
+            return
         
         print(f"[DEBUG] Response status: {response.status_code}")
         print(f"[DEBUG] Response body: {response.text}")
@@ -344,23 +328,29 @@ def mention_self_and_bot(chat: ChatContext):
         traceback.print_exc()
         chat.reply("멘션 중 오류가 발생했습니다.")
 
+@command("!방장")
 def mention_room_master(chat: ChatContext):
     """현재 방의 방장을 멘션합니다."""
     try:
         print(f"[DEBUG] mention_room_master called")
         print(f"[DEBUG] Room ID: {chat.room.id}")
         
-        # 먼저 DB에서 방장 정보 조회
-        master_info = get_room_master_from_db(chat)
+        # 캐시 -> DB -> 멤버 리스트 순서로 방장 정보 조회
+        master_info = room_master_cache.get(chat.room.id)
         
-        # DB에서 못 찾으면 멤버 리스트에서 찾기
         if not master_info:
-            print(f"[DEBUG] Trying to find master from members list")
-            master_info = get_room_master_from_members(chat)
+            master_info = get_room_master_from_db(chat)
         
-        if not master_info:
-            chat.reply("방장 정보를 찾을 수 없습니다.")
-            return
+            # DB에서 못 찾으면 멤버 리스트에서 찾기
+            if not master_info:
+                print(f"[DEBUG] Trying to find master from members list")
+                master_info = get_room_master_from_members(chat)
+        
+            if not master_info:
+                chat.reply("방장 정보를 찾을 수 없습니다.")
+                return
+            
+            room_master_cache.put(chat.room.id, master_info)
         
         master_id = master_info["id"]
         master_name = master_info["name"]
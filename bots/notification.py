@@ -1,62 +1,20 @@
-import requests
+from helper.HttpClient import http
 import json
 import uuid
 from iris import ChatContext
 from iris.decorators import *
-
-def get_auth_from_iris(iris_endpoint: str):
-    """Iris에서 AOT 토큰 정보를 가져옵니다."""
-    try:
-        print(f"[DEBUG] Iris endpoint: {iris_endpoint}")
-        aot_url = f"{iris_endpoint}/aot"
-        print(f"[DEBUG] Requesting AOT from: {aot_url}")
-        
-        response = requests.get(aot_url)
-        print(f"[DEBUG] AOT response status: {response.status_code}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            print(f"[DEBUG] AOT data received: {data}")
-            
-            if data.get("success"):
-                aot_data = data.get("aot", {})
-                access_token = aot_data.get("access_token")
-                device_uuid = aot_data.get("d_id")
-                
-                if not access_token or not device_uuid:
-                    print(f"[ERROR] Missing access_token or d_id")
-                    return None
-                
-                session_info = f"{access_token}-{device_uuid}"
-                print(f"[DEBUG] Session info created: {session_info[:30]}...{session_info[-20:]}")
-                return session_info
-        return None
-    except Exception as e:
-        print(f"[ERROR] Error getting auth from Iris: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+from helper.CommandRouter import command
+from helper.IrisAuth import AuthProvider, get_provider
+from helper.RoomInfo import get_room_meta, invalidate_room
 
 def get_link_id_from_room(chat: ChatContext):
     """채팅방의 link_id를 가져옵니다 (오픈채팅방용)."""
     try:
-        chat_id = str(chat.room.id)
-        
-        print(f"[DEBUG] Getting link_id for chat_id: {chat_id}")
-        
-        # chat_rooms 테이블에서 직접 link_id 조회
-        query = "SELECT id, link_id, type FROM chat_rooms WHERE id = ?"
-        result = chat.api.query(
-            query=query,
-            bind=[chat_id]
-        )
+        room_meta = get_room_meta(chat.room.id, chat.api.query)
         
-        print(f"[DEBUG] chat_rooms query result: {result}")
-        
-        if result and len(result) > 0 and result[0].get("link_id"):
-            link_id = result[0].get("link_id")
-            print(f"[DEBUG] Found link_id: {link_id}")
-            return link_id
+        if room_meta and room_meta.link_id:
+            print(f"[DEBUG] Found link_id: {room_meta.link_id}")
+            return room_meta.link_id
         
         print(f"[DEBUG] No link_id found - this might not be an open chat")
         return None
@@ -69,22 +27,11 @@ def get_link_id_from_room(chat: ChatContext):
 def get_post_id_from_room(chat: ChatContext):
     """채팅방의 moim_meta에서 post_id를 가져옵니다."""
     try:
-        result = chat.api.query(
-            query="SELECT moim_meta FROM chat_rooms WHERE id = ?",
-            bind=[str(chat.room.id)]
-        )
-
-        if result and result[0].get("moim_meta"):
-            raw_meta = result[0].get("moim_meta")
-            moim_meta = json.loads(raw_meta)
-
-            if isinstance(moim_meta, list) and moim_meta:
-                ct_raw = moim_meta[0].get("ct")
-                if ct_raw:
-                    ct_data = json.loads(ct_raw)
-                    post_id = ct_data.get("id")
-                    print(f"[DEBUG] Found post_id: {post_id}")
-                    return post_id
+        room_meta = get_room_meta(chat.room.id, chat.api.query)
+        
+        if room_meta and room_meta.post_id:
+            print(f"[DEBUG] Found post_id: {room_meta.post_id}")
+            return room_meta.post_id
         
         print(f"[DEBUG] No post_id found in moim_meta")
         return None
@@ -94,7 +41,7 @@ def get_post_id_from_room(chat: ChatContext):
         traceback.print_exc()
         return None
 
-def share_notice(chat: ChatContext, post_id: str, session_info: str, link_id: str = None):
+def share_notice(chat: ChatContext, post_id: str, auth: AuthProvider, link_id: str = None):
     """공지를 공유합니다."""
     try:
         # 오픈채팅 여부에 따라 URL 변경
@@ -105,20 +52,26 @@ def share_notice(chat: ChatContext, post_id: str, session_info: str, link_id: st
             url = f"https://talkmoim-api.kakao.com/posts/{post_id}/share"
             print(f"[DEBUG] Using regular chat URL")
         
-        # 더 완전한 헤더 설정
-        headers = {
-            "content-length": "0",
-            "accept-encoding": "gzip",
-            "a": "android/11.0.0/ko",
-            "c": str(uuid.uuid4()),
-            "accept-language": "ko",
-            "user-agent": "KT/11.0.0 An/9 ko",
-            "authorization": session_info
-        }
+        def send(session_info):
+            # 더 완전한 헤더 설정
+            headers = {
+                "content-length": "0",
+                "accept-encoding": "gzip",
+                "a": "android/11.0.0/ko",
+                "c": str(uuid.uuid4()),
+                "accept-language": "ko",
+                "user-agent": "KT/11.0.0 An/9 ko",
+                "authorization": session_info
+            }
+            return http.post(url, headers=headers)
         
         print(f"[DEBUG] Sharing notice - URL: {url}")
         
-        response = requests.post(url, headers=headers)
+        # 인증 오류(401, -401)면 토큰을 갱신해서 한 번 재시도
+        response = auth.request(send)
+        
+        if response is None:
+            return False, "인증 정보를 가져올 수 없습니다"
         
         print(f"[DEBUG] Share response status: {response.status_code}")
         print(f"[DEBUG] Share response body: {response.text}")
@@ -158,6 +111,7 @@ def share_notice(chat: ChatContext, post_id: str, session_info: str, link_id: st
         traceback.print_exc()
         return False, f"예외 발생: {str(e)}"
 
+@command("!공지")
 @has_param
 def share_notice_command(chat: ChatContext):
     """!공지 명령어 - post_id를 받아 공지를 공유합니다."""
@@ -173,10 +127,10 @@ def share_notice_command(chat: ChatContext):
         
         print(f"[DEBUG] Post ID from param: {post_id}")
         
-        # Iris에서 인증 정보 가져오기
-        session_info = get_auth_from_iris(chat.api.iris_endpoint)
+        # Iris 인증 정보 (캐시된 토큰 사용)
+        auth = get_provider(chat.api.iris_endpoint)
         
-        if not session_info:
+        if not auth.get():
             chat.reply("인증 정보를 가져올 수 없습니다.")
             return
         
@@ -184,7 +138,7 @@ def share_notice_command(chat: ChatContext):
         link_id = get_link_id_from_room(chat)
         
         # 공지 공유
-        success, message = share_notice(chat, post_id, session_info, link_id)
+        success, message = share_notice(chat, post_id, auth, link_id)
         
         if success:
             chat.reply(f"✅ 공지 공유 완료\npost_id: {post_id}")
@@ -197,6 +151,7 @@ def share_notice_command(chat: ChatContext):
         traceback.print_exc()
         chat.reply("공지 공유 중 오류가 발생했습니다.")
 
+@command("!현재공지")
 def share_current_notice(chat: ChatContext):
     """!현재공지 명령어 - 현재 방의 공지를 공유합니다."""
     try:
@@ -211,10 +166,10 @@ def share_current_notice(chat: ChatContext):
         
         print(f"[DEBUG] Current room post_id: {post_id}")
         
-        # Iris에서 인증 정보 가져오기
-        session_info = get_auth_from_iris(chat.api.iris_endpoint)
+        # Iris 인증 정보 (캐시된 토큰 사용)
+        auth = get_provider(chat.api.iris_endpoint)
         
-        if not session_info:
+        if not auth.get():
             chat.reply("인증 정보를 가져올 수 없습니다.")
             return
         
@@ -222,7 +177,7 @@ def share_current_notice(chat: ChatContext):
         link_id = get_link_id_from_room(chat)
         
         # 공지 공유
-        success, message = share_notice(chat, post_id, session_info, link_id)
+        success, message = share_notice(chat, post_id, auth, link_id)
         
         if success:
             chat.reply(f"✅ 현재 방의 공지를 공유했습니다\npost_id: {post_id}")
@@ -235,7 +190,7 @@ def share_current_notice(chat: ChatContext):
         traceback.print_exc()
         chat.reply("공지 공유 중 오류가 발생했습니다.")
 
-def set_notice(chat: ChatContext, text: str, session_info: str, link_id: str = None):
+def set_notice(chat: ChatContext, text: str, auth: AuthProvider, link_id: str = None):
     """공지를 등록합니다."""
     try:
         import urllib.parse
@@ -253,16 +208,21 @@ def set_notice(chat: ChatContext, text: str, session_info: str, link_id: str = N
             body = f"content={urllib.parse.quote(content)}&object_type=TEXT&notice=true"
             print(f"[DEBUG] Using regular chat URL")
         
-        headers = {
-            "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
-            "A": "android/11.0.0/ko",
-            "Authorization": session_info
-        }
+        def send(session_info):
+            headers = {
+                "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
+                "A": "android/11.0.0/ko",
+                "Authorization": session_info
+            }
+            return http.post(url, data=body, headers=headers)
         
         print(f"[DEBUG] Setting notice - URL: {url}")
         print(f"[DEBUG] Body: {body}")
         
-        response = requests.post(url, data=body, headers=headers)
+        response = auth.request(send)
+        
+        if response is None:
+            return False, "인증 정보를 가져올 수 없습니다"
         
         print(f"[DEBUG] Set notice response status: {response.status_code}")
         print(f"[DEBUG] Set notice response body: {response.text}")
@@ -298,6 +258,7 @@ def set_notice(chat: ChatContext, text: str, session_info: str, link_id: str = N
         traceback.print_exc()
         return False, str(e)
 
+@command("!공지등록")
 @has_param
 def set_notice_command(chat: ChatContext):
     """!공지등록 명령어 - 새로운 공지를 등록합니다."""
@@ -310,10 +271,10 @@ def set_notice_command(chat: ChatContext):
             chat.reply("사용법: !공지등록 <내용>")
             return
         
-        # Iris에서 인증 정보 가져오기
-        session_info = get_auth_from_iris(chat.api.iris_endpoint)
+        # Iris 인증 정보 (캐시된 토큰 사용)
+        auth = get_provider(chat.api.iris_endpoint)
         
-        if not session_info:
+        if not auth.get():
             chat.reply("인증 정보를 가져올 수 없습니다.")
             return
         
@@ -321,9 +282,11 @@ def set_notice_command(chat: ChatContext):
         link_id = get_link_id_from_room(chat)
         
         # 공지 등록
-        success, result = set_notice(chat, text, session_info, link_id)
+        success, result = set_notice(chat, text, auth, link_id)
         
         if success:
+            # 방의 현재 공지가 바뀌었으므로 캐시된 post_id 폐기
+            invalidate_room(chat.room.id)
             if result:
                 chat.reply(f"✅ 공지 등록 완료\npost_id: {result}")
             else:
@@ -337,7 +300,7 @@ def set_notice_command(chat: ChatContext):
         traceback.print_exc()
         chat.reply("공지 등록 중 오류가 발생했습니다.")
 
-def delete_notice(post_id: str, session_info: str, link_id: str = None):
+def delete_notice(post_id: str, auth: AuthProvider, link_id: str = None):
     """공지를 삭제합니다."""
     try:
         # 오픈채팅 여부에 따라 URL 변경
@@ -348,14 +311,19 @@ def delete_notice(post_id: str, session_info: str, link_id: str = None):
             url = f"https://talkmoim-api.kakao.com/posts/{post_id}"
             print(f"[DEBUG] Using regular chat URL")
         
-        headers = {
-            "A": "android/11.0.0/ko",
-            "Authorization": session_info
-        }
+        def send(session_info):
+            headers = {
+                "A": "android/11.0.0/ko",
+                "Authorization": session_info
+            }
+            return http.delete(url, headers=headers)
         
         print(f"[DEBUG] Deleting notice - URL: {url}")
         
-        response = requests.delete(url, headers=headers)
+        response = auth.request(send)
+        
+        if response is None:
+            return False, "인증 정보를 가져올 수 없습니다"
         
         print(f"[DEBUG] Delete notice response status: {response.status_code}")
         print(f"[DEBUG] Delete notice response body: {response.text}")
@@ -391,6 +359,7 @@ def delete_notice(post_id: str, session_info: str, link_id: str = None):
         traceback.print_exc()
         return False, str(e)
 
+@command("!공지삭제")
 @has_param
 def delete_notice_command(chat: ChatContext):
     """!공지삭제 명령어 - 공지를 삭제합니다."""
@@ -403,10 +372,10 @@ def delete_notice_command(chat: ChatContext):
             chat.reply("사용법: !공지삭제 <post_id>")
             return
         
-        # Iris에서 인증 정보 가져오기
-        session_info = get_auth_from_iris(chat.api.iris_endpoint)
+        # Iris 인증 정보 (캐시된 토큰 사용)
+        auth = get_provider(chat.api.iris_endpoint)
         
-        if not session_info:
+        if not auth.get():
             chat.reply("인증 정보를 가져올 수 없습니다.")
             return
         
@@ -414,9 +383,10 @@ def delete_notice_command(chat: ChatContext):
         link_id = get_link_id_from_room(chat)
         
         # 공지 삭제
-        success, message = delete_notice(post_id, session_info, link_id)
+        success, message = delete_notice(post_id, auth, link_id)
         
         if success:
+            invalidate_room(chat.room.id)
             chat.reply(f"✅ 공지 삭제 완료\npost_id: {post_id}")
         else:
             chat.reply(f"❌ 공지 삭제 실패\n사유: {message}")
@@ -427,7 +397,7 @@ def delete_notice_command(chat: ChatContext):
         traceback.print_exc()
         chat.reply("공지 삭제 중 오류가 발생했습니다.")
 
-def change_notice(post_id: str, text: str, session_info: str, link_id: str = None):
+def change_notice(post_id: str, text: str, auth: AuthProvider, link_id: str = None):
     """공지를 수정합니다."""
     try:
         import urllib.parse
@@ -445,16 +415,21 @@ def change_notice(post_id: str, text: str, session_info: str, link_id: str = Non
             body = f"content={urllib.parse.quote(content)}&object_type=TEXT&notice=true"
             print(f"[DEBUG] Using regular chat URL")
         
-        headers = {
-            "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
-            "A": "android/11.0.0/ko",
-            "Authorization": session_info
-        }
+        def send(session_info):
+            headers = {
+                "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
+                "A": "android/11.0.0/ko",
+                "Authorization": session_info
+            }
+            return http.put(url, data=body, headers=headers)
         
         print(f"[DEBUG] Changing notice - URL: {url}")
         print(f"[DEBUG] Body: {body}")
         
-        response = requests.put(url, data=body, headers=headers)
+        response = auth.request(send)
+        
+        if response is None:
+            return False, "인증 정보를 가져올 수 없습니다"
         
         print(f"[DEBUG] Change notice response status: {response.status_code}")
         print(f"[DEBUG] Change notice response body: {response.text}")
@@ -490,6 +465,7 @@ def change_notice(post_id: str, text: str, session_info: str, link_id: str = Non
         traceback.print_exc()
         return False, str(e)
 
+@command("!공지수정")
 @has_param
 def change_notice_command(chat: ChatContext):
     """!공지수정 명령어 - 공지를 수정합니다."""
@@ -505,10 +481,10 @@ def change_notice_command(chat: ChatContext):
         post_id = params[0].strip()
         text = params[1].strip()
         
-        # Iris에서 인증 정보 가져오기
-        session_info = get_auth_from_iris(chat.api.iris_endpoint)
+        # Iris 인증 정보 (캐시된 토큰 사용)
+        auth = get_provider(chat.api.iris_endpoint)
         
-        if not session_info:
+        if not auth.get():
             chat.reply("인증 정보를 가져올 수 없습니다.")
             return
         
@@ -516,9 +492,10 @@ def change_notice_command(chat: ChatContext):
         link_id = get_link_id_from_room(chat)
         
         # 공지 수정
-        success, message = change_notice(post_id, text, session_info, link_id)
+        success, message = change_notice(post_id, text, auth, link_id)
         
         if success:
+            invalidate_room(chat.room.id)
             chat.reply(f"✅ 공지 수정 완료\npost_id: {post_id}")
         else:
             chat.reply(f"❌ 공지 수정 실패\n사유: {message}")
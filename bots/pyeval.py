@@ -1,16 +1,21 @@
 # coding: utf8
 import sys
+import os
 import subprocess
+import tempfile
 from iris import ChatContext
 from iris.decorators import *
+from helper.CommandRouter import command
 
+@command("!py", cost="eval")
 #@is_admin
 @has_param
 def python_eval(chat: ChatContext):
-    with open('temp.py', 'w') as tp:
+    # eval 풀에서 동시에 실행될 수 있으므로 요청마다 별도 파일 사용
+    with tempfile.NamedTemporaryFile('w', suffix='.py', dir='.', delete=False) as tp:
         tp.write(chat.message.msg[4:])
     try:
-        exec_out = subprocess.check_output([".venv/bin/python", "temp.py"],stderr=subprocess.PIPE,timeout=30).decode("utf-8")
+        exec_out = subprocess.check_output([".venv/bin/python", tp.name],stderr=subprocess.PIPE,timeout=30).decode("utf-8")
         if exec_out[-1:] == "\n":
                 exec_out = exec_out[:-1]
     except subprocess.TimeoutExpired:
@@ -18,9 +23,12 @@ def python_eval(chat: ChatContext):
     except subprocess.CalledProcessError as e:
         exec_out = e.stderr.decode("utf-8")
         exec_out = exec_out[str(exec_out).find("line"):-1]
+    finally:
+        os.remove(tp.name)
     print(exec_out)
     chat.reply(exec_out)
 
+@command("!ev", inject=("kl",), cost="eval")
 #@is_admin
 @has_param
 def real_eval(chat: ChatContext, kl):
@@ -1,28 +1,22 @@
 from iris import ChatContext
 from iris.decorators import *
+from helper.CommandRouter import command
 
-def reply_photo(chat: ChatContext, kl):
-    match chat.message.command:
-        case "!tt":
-            send_tiger(chat)
-        case "!ttt":
-            send_triple_tiger(chat)
-        case "!프사":
-            send_avatar(chat)
-        case "!프사링":
-            send_avatar_kakaolink(chat, kl)
-
+@command("!tt", shared=True)
 def send_tiger(chat: ChatContext):
     chat.reply_media("res/aaa.jpeg")
 
+@command("!ttt", shared=True)
 def send_triple_tiger(chat: ChatContext):
     chat.reply_media([open("res/aaa.jpeg", "rb"), open("res/aaa.jpeg", "rb"), open("res/aaa.jpeg", "rb")])
 
+@command("!프사")
 @is_reply
 def send_avatar(chat: ChatContext):
     avatar = chat.get_source().sender.avatar.img
     chat.reply_media(avatar)
     
+@command("!프사링", inject=("kl",))
 @is_reply
 def send_avatar_kakaolink(chat: ChatContext, kl):
     avatar = chat.get_source().sender.avatar
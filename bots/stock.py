@@ -1,10 +1,23 @@
 import requests
+from helper.HttpClient import http
 from PIL import Image, ImageDraw, ImageFont
 import io
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from iris.decorators import *
 from iris import ChatContext
+from helper.CommandRouter import command
+from helper.StockSearch import stock_search
+from helper.StockCache import chart_cache, quote_cache, card_cache, card_key, market_ttl, stock_timings, CHART_TTL, QUOTE_TTL, CHART_DEADLINE
 
+# 차트가 없을 때 카드 크기 (차트 이미지 폭에 맞춤)
+TEXT_CARD_WIDTH = 700
+TEXT_CARD_HEIGHT = 280
+
+_fetch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="stock-fetch")
+
+@command("!주식", cost="cpu", shared=True)
 @has_param
 def create_stock_image(chat: ChatContext):
     """
@@ -12,36 +25,85 @@ def create_stock_image(chat: ChatContext):
     """
     try:
         # 1. Fetch stock code
+        started = time.perf_counter()
         query = chat.message.msg[4:]
-        autocomplete_url = f"https://ac.stock.naver.com/ac?q={query}&target=stock%2Cipo%2Cindex%2Cmarketindicator"
-        autocomplete_response = requests.get(autocomplete_url)
-        autocomplete_response.raise_for_status()
-        autocomplete_json = autocomplete_response.json()
+        item = stock_search.search(query)
+        stock_timings.record("검색", time.perf_counter() - started)
 
-        if not autocomplete_json['items'] or not autocomplete_json['items'][0]:
+        if item is None:
             chat.reply("종목을 찾는데 실패했습니다.")
             return None
         
-        type_code = autocomplete_json['items'][0]['typeCode']
-        if not type_code in ["KOSPI","KOSDAQ"]:
+        if not item.domestic:
             chat.reply("현재는 국내 주식시장만 지원합니다.")
             return None
 
-        stock_code = autocomplete_json['items'][0]["code"]
-        stock_name = autocomplete_json['items'][0]["name"]
+        stock_code = item.code
+        stock_name = item.name
+
+        # 2. Fetch stock chart image and real-time stock data concurrently
+        fetch_started = time.perf_counter()
+        chart_future = _fetch_executor.submit(timed, "차트", fetch_chart, stock_code)
+        quote_future = _fetch_executor.submit(timed, "시세", fetch_quote, stock_code)
+        stock_data = quote_future.result()
+        if stock_data is None:
+            return None
+        try:
+            # 차트가 늦으면 글자만 있는 카드를 보냅니다. 받던 차트는 끝나면 캐시에 들어갑니다.
+            chart_png = chart_future.result(timeout=max(CHART_DEADLINE - (time.perf_counter() - fetch_started), 0))
+        except Exception as e:
+            print(f"[stock] {stock_code} 차트 없이 보냅니다 ({type(e).__name__})")
+            stock_timings.record_text_only()
+            chart_png = None
+
+        # 3. Render the card (같은 시세면 그려 둔 카드를 씁니다)
+        key = card_key(stock_code, chart_png, stock_data)
+        card_png = card_cache.get(key)
+        if card_png is None:
+            card_png = timed("그리기", render_card, stock_name, stock_code, chart_png, stock_data)
+            if chart_png is not None:
+                card_cache.put(key, card_png, market_ttl(CHART_TTL))
+
+        stock_timings.record("전체", time.perf_counter() - started)
+        return chat.reply_media([io.BytesIO(card_png)])
+
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return None
+    except json.JSONDecodeError as e:
+        print(f"JSON decode error: {e}")
+        return None
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return None
+
 
-        # 2. Fetch stock chart image
+def timed(stage: str, func, *args):
+    started = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        stock_timings.record(stage, time.perf_counter() - started)
+
+
+def fetch_chart(stock_code: str) -> bytes:
+    """일봉 차트 PNG. 장중에는 CHART_TTL, 장 마감 뒤에는 다음 장까지 캐시합니다."""
+    chart_png = chart_cache.get(stock_code)
+    if chart_png is None:
         chart_url = f"https://ssl.pstatic.net/imgfinance/chart/item/area/day/{stock_code}.png"
-        chart_response = requests.get(chart_url, stream=True)
+        chart_response = http.get(chart_url)
         chart_response.raise_for_status()
+        chart_png = chart_response.content
+        chart_cache.put(stock_code, chart_png, market_ttl(CHART_TTL))
+    return chart_png
 
-        chart_image = Image.open(io.BytesIO(chart_response.content)).convert("RGBA")
-        #chart_image = create_candlestick_chart(test_json)
-        chart_width, chart_height = chart_image.size
 
-        # 3. Fetch real-time stock data
+def fetch_quote(stock_code: str) -> dict | None:
+    """실시간 시세. 장중에는 QUOTE_TTL, 장 마감 뒤에는 다음 장까지 캐시합니다."""
+    stock_data = quote_cache.get(stock_code)
+    if stock_data is None:
         realtime_url = f"https://polling.finance.naver.com/api/realtime?query=SERVICE_RECENT_ITEM:{stock_code}"
-        realtime_response = requests.get(realtime_url)
+        realtime_response = http.get(realtime_url)
         realtime_response.raise_for_status()
         realtime_json = realtime_response.json()
 
@@ -49,128 +111,137 @@ def create_stock_image(chat: ChatContext):
             return None
 
         stock_data = realtime_json['result']['areas'][0]['datas'][0]
+        quote_cache.put(stock_code, stock_data, market_ttl(QUOTE_TTL))
+    return stock_data
 
-        # 4. Create white area and paste chart
+
+def render_card(stock_name: str, stock_code: str, chart_png: bytes | None, stock_data: dict) -> bytes:
+    """차트 아래에 종목 정보를 그린 카드 PNG. chart_png가 None이면 종목 정보만 그립니다."""
+    # 1. Create white area and paste chart
+    if chart_png is None:
+        new_image = Image.new("RGB", (TEXT_CARD_WIDTH, TEXT_CARD_HEIGHT), "white")
+    else:
+        chart_image = Image.open(io.BytesIO(chart_png)).convert("RGBA")
+        chart_width, chart_height = chart_image.size
         new_height = 550
         new_image = Image.new("RGB", (chart_width, new_height), "white")
         new_image.paste(chart_image, (0, new_height - chart_height), chart_image)
 
-        # 5. Add stock information
-        draw = ImageDraw.Draw(new_image)
-        try:
-            font_path = "res/GmarketSansMedium.otf"
-            font_size_title = 40
-            font_size_code = 18
-            font_size_normal = 30
-            font_title = ImageFont.truetype(font_path, font_size_title)
-            font_code = ImageFont.truetype(font_path, font_size_code)
-            font_normal = ImageFont.truetype(font_path, font_size_normal)
+    # 2. Add stock information
+    draw = ImageDraw.Draw(new_image)
+    try:
+        font_path = "res/GmarketSansMedium.otf"
+        font_size_title = 40
+        font_size_code = 18
+        font_size_normal = 30
+        font_title = ImageFont.truetype(font_path, font_size_title)
+        font_code = ImageFont.truetype(font_path, font_size_code)
+        font_normal = ImageFont.truetype(font_path, font_size_normal)
 
-        except IOError as e:
-            print(f"IOError during font loading: {e}")
-            font_title = ImageFont.load_default()
-            font_code = ImageFont.load_default()
-            font_normal = ImageFont.load_default()
+    except IOError as e:
+        print(f"IOError during font loading: {e}")
+        font_title = ImageFont.load_default()
+        font_code = ImageFont.load_default()
+        font_normal = ImageFont.load_default()
 
 
-        text_color = (0, 0, 0)
+    text_color = (0, 0, 0)
 
-        # Stock Name and Code
-        title_text = stock_name
-        code_text = stock_code
+    # Stock Name and Code
+    title_text = stock_name
+    code_text = stock_code
 
-        title_x, title_y = 15, 15
-        draw.text((title_x, title_y), title_text, font=font_title, fill=text_color)
+    title_x, title_y = 15, 15
+    draw.text((title_x, title_y), title_text, font=font_title, fill=text_color)
 
-        title_bbox = font_title.getbbox(title_text)
-        code_bbox = font_code.getbbox(code_text)
+    title_bbox = font_title.getbbox(title_text)
+    code_bbox = font_code.getbbox(code_text)
 
-        code_x = title_x + title_bbox[2] + 10 # position code after name with spacing
-        code_y = title_y + title_bbox[3] - code_bbox[3] # bottom align code with name
+    code_x = title_x + title_bbox[2] + 10 # position code after name with spacing
+    code_y = title_y + title_bbox[3] - code_bbox[3] # bottom align code with name
 
-        draw.text((code_x, code_y), code_text, font=font_code, fill=text_color)
+    draw.text((code_x, code_y), code_text, font=font_code, fill=text_color)
 
 
-        # Current Price and Change
-        current_price_text = f"{stock_data['nv']:,}"
-        change_text = f"{stock_data['cv']:,}"
-        change_rate_text = f"{stock_data['cr']:.2f}%"
+    # Current Price and Change
+    current_price_text = f"{stock_data['nv']:,}"
+    change_text = f"{stock_data['cv']:,}"
+    change_rate_text = f"{stock_data['cr']:.2f}%"
 
-        price_x = 15
-        price_y = code_y + code_bbox[3] + 30 # position price after code line. No change needed for bottom align of price line itself
-        change_color = (255, 0, 0) if stock_data['rf'] == '2' else (0, 0, 255) if stock_data['rf'] == '5' else text_color
-        current_price_color = change_color if stock_data['rf'] != '0' else text_color
+    price_x = 15
+    price_y = code_y + code_bbox[3] + 30 # position price after code line. No change needed for bottom align of price line itself
+    change_color = (255, 0, 0) if stock_data['rf'] == '2' else (0, 0, 255) if stock_data['rf'] == '5' else text_color
+    current_price_color = change_color if stock_data['rf'] != '0' else text_color
 
-        draw.text((price_x, price_y), current_price_text, font=font_title, fill=current_price_color)
-        price_bbox = font_title.getbbox(current_price_text)
-        price_bottom_y = price_y + price_bbox[3]
+    draw.text((price_x, price_y), current_price_text, font=font_title, fill=current_price_color)
+    price_bbox = font_title.getbbox(current_price_text)
+    price_bottom_y = price_y + price_bbox[3]
 
-        change_symbol = "▲" if stock_data['rf'] == '2' else "▼" if stock_data['rf'] == '5' else ""
-        change_x = price_x + font_title.getlength(current_price_text) + 10
+    change_symbol = "▲" if stock_data['rf'] == '2' else "▼" if stock_data['rf'] == '5' else ""
+    change_x = price_x + font_title.getlength(current_price_text) + 10
 
-        change_symbol_bbox = font_normal.getbbox(change_symbol)
-        change_text_bbox = font_normal.getbbox(change_text)
-        change_rate_text_bbox = font_normal.getbbox(change_rate_text)
+    change_symbol_bbox = font_normal.getbbox(change_symbol)
+    change_text_bbox = font_normal.getbbox(change_text)
+    change_rate_text_bbox = font_normal.getbbox(change_rate_text)
 
-        change_symbol_y = price_bottom_y - change_symbol_bbox[3]
-        change_text_y = price_bottom_y - change_rate_text_bbox[3]
-        change_rate_text_y = price_bottom_y - change_rate_text_bbox[3]
+    change_symbol_y = price_bottom_y - change_symbol_bbox[3]
+    change_text_y = price_bottom_y - change_rate_text_bbox[3]
+    change_rate_text_y = price_bottom_y - change_rate_text_bbox[3]
 
 
-        draw.text((change_x, change_symbol_y), change_symbol, font=font_normal, fill=change_color)
-        draw.text((change_x + font_normal.getlength(change_symbol), change_text_y), change_text, font=font_normal, fill=change_color)
-        draw.text((change_x + font_normal.getlength(change_symbol + change_text) + 15, change_rate_text_y), change_rate_text, font=font_normal, fill=change_color)
+    draw.text((change_x, change_symbol_y), change_symbol, font=font_normal, fill=change_color)
+    draw.text((change_x + font_normal.getlength(change_symbol), change_text_y), change_text, font=font_normal, fill=change_color)
+    draw.text((change_x + font_normal.getlength(change_symbol + change_text) + 15, change_rate_text_y), change_rate_text, font=font_normal, fill=change_color)
 
 
-        # Previous Day, High, Volume etc.
-        info_x_start_label = 15
-        info_x_start_value = 90
-        info_y_start = price_y + font_title.getbbox(current_price_text)[3] + 30
-        line_height = 32
-        info_margin = 220
+    # Previous Day, High, Volume etc.
+    info_x_start_label = 15
+    info_x_start_value = 90
+    info_y_start = price_y + font_title.getbbox(current_price_text)[3] + 30
+    line_height = 32
+    info_margin = 220
 
-        # First column (전일, 시가, 저가)
-        draw.text((info_x_start_label, info_y_start), "전일", font=font_normal, fill=text_color)
-        draw.text((info_x_start_label, info_y_start + line_height), "시가", font=font_normal, fill=text_color)
-        draw.text((info_x_start_label, info_y_start + 2 * line_height), "저가", font=font_normal, fill=text_color)
+    # First column (전일, 시가, 저가)
+    draw.text((info_x_start_label, info_y_start), "전일", font=font_normal, fill=text_color)
+    draw.text((info_x_start_label, info_y_start + line_height), "시가", font=font_normal, fill=text_color)
+    draw.text((info_x_start_label, info_y_start + 2 * line_height), "저가", font=font_normal, fill=text_color)
 
-        draw.text((info_x_start_value, info_y_start), f"{stock_data['pcv']:,}", font=font_normal, fill=text_color)
-        draw.text((info_x_start_value, info_y_start + line_height), f"{stock_data['ov']:,}", font=font_normal, fill=text_color)
-        draw.text((info_x_start_value, info_y_start + 2 * line_height), f"{stock_data['lv']:,}", font=font_normal, fill=text_color)
+    draw.text((info_x_start_value, info_y_start), f"{stock_data['pcv']:,}", font=font_normal, fill=text_color)
+    draw.text((info_x_start_value, info_y_start + line_height), f"{stock_data['ov']:,}", font=font_normal, fill=text_color)
+    draw.text((info_x_start_value, info_y_start + 2 * line_height), f"{stock_data['lv']:,}", font=font_normal, fill=text_color)
 
 
-        # Second column (고가, 거래량, 거래대금) - Aligned values
-        info_x_start_label_col2 = info_x_start_value + info_margin
-        info_x_start_value_col2 = info_x_start_label_col2 + 150
+    # Second column (고가, 거래량, 거래대금) - Aligned values
+    info_x_start_label_col2 = info_x_start_value + info_margin
+    info_x_start_value_col2 = info_x_start_label_col2 + 150
 
-        draw.text((info_x_start_label_col2, info_y_start), "고가", font=font_normal, fill=text_color)
-        draw.text((info_x_start_label_col2, info_y_start + line_height), "거래량", font=font_normal, fill=text_color)
-        draw.text((info_x_start_label_col2, info_y_start + 2 * line_height), "거래대금", font=font_normal, fill=text_color)
+    draw.text((info_x_start_label_col2, info_y_start), "고가", font=font_normal, fill=text_color)
+    draw.text((info_x_start_label_col2, info_y_start + line_height), "거래량", font=font_normal, fill=text_color)
+    draw.text((info_x_start_label_col2, info_y_start + 2 * line_height), "거래대금", font=font_normal, fill=text_color)
 
 
-        high_price_text = f"{stock_data['hv']:,}"
-        volume_text = f"{stock_data['aq']:,}"
-        transaction_amount_text = f"{int(stock_data['aa']/1000000):,} 백만"
+    high_price_text = f"{stock_data['hv']:,}"
+    volume_text = f"{stock_data['aq']:,}"
+    transaction_amount_text = f"{int(stock_data['aa']/1000000):,} 백만"
 
-        value_col2_x = info_x_start_value_col2
-        draw.text((value_col2_x, info_y_start), high_price_text, font=font_normal, fill=text_color)
-        draw.text((value_col2_x, info_y_start + line_height), volume_text, font=font_normal, fill=text_color)
-        draw.text((value_col2_x, info_y_start + 2 * line_height), transaction_amount_text, font=font_normal, fill=text_color)
+    value_col2_x = info_x_start_value_col2
+    draw.text((value_col2_x, info_y_start), high_price_text, font=font_normal, fill=text_color)
+    draw.text((value_col2_x, info_y_start + line_height), volume_text, font=font_normal, fill=text_color)
+    draw.text((value_col2_x, info_y_start + 2 * line_height), transaction_amount_text, font=font_normal, fill=text_color)
 
 
-        # 6. Return the image as bytes
-        img_byte_arr = io.BytesIO()
-        new_image.save(img_byte_arr, format='PNG')
-        img_byte_arr = io.BytesIO(img_byte_arr.getvalue())
+    # 3. Return the image as bytes
+    img_byte_arr = io.BytesIO()
+    new_image.save(img_byte_arr, format='PNG')
+    return img_byte_arr.getvalue()
 
-        return chat.reply_media([img_byte_arr])
 
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
-        return None
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        return None
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        return None
\ No newline at end of file
+@command("!주식지표")
+@is_admin
+def stock_timing_command(chat: ChatContext):
+    """!주식지표 명령어 - !주식 단계별 소요 시간과 캐시 적중률을 보여줍니다."""
+    lines = ["!주식 단계별 시간"] + stock_timings.report()
+    for name, cache in (("차트", chart_cache), ("시세", quote_cache), ("카드", card_cache)):
+        stats = cache.stats()
+        lines.append(f"{name} 캐시 : {stats['size']}개 / 적중률 {stats['hit_rate'] * 100:.0f}%")
+    chat.reply("\n".join(lines))
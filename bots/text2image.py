@@ -1,35 +1,23 @@
 # coding: utf8
 from PIL import Image, ImageFont, ImageDraw
-import requests, random, os
+import random, os
+from helper.HttpClient import http
 from io import BytesIO, BufferedReader
 from bots.gemini import get_gemini_vision_analyze_image
 from iris.decorators import *
 from iris import ChatContext, PyKV
+from helper.CommandRouter import command
 
 RES_PATH = "res/"
 disallowed_substrings = ["medium.com", "post.phinf.naver.net", ".gif", "imagedelivery.net", "clien.net"]
 
-def draw_text(chat: ChatContext):
-    match chat.message.command:
-        case "!텍스트":
-            draw_default(chat)
-        case "!사진":
-            txt = chat.message.param
-            chat.message.param = f"검색##{txt}##  "
-            draw_default(chat)
-        case "!껄무새":
-            draw_parrot(chat)
-        case "!멈춰":
-            draw_stop(chat)
-        case "!지워":
-            draw_rmrf(chat)
-        case "!진행":
-            draw_gogo(chat)
-        case "!말대꾸":
-            draw_sungmo(chat)
-        case "!텍스트추가":
-            add_text(chat)
+@command("!사진", cost="cpu")
+def draw_search(chat: ChatContext):
+    txt = chat.message.param
+    chat.message.param = f"검색##{txt}##  "
+    draw_default(chat)
 
+@command("!텍스트", cost="cpu")
 def draw_default(chat: ChatContext):
     try:
         msg = chat.message.param
@@ -78,16 +66,19 @@ def draw_default(chat: ChatContext):
             failed_urls.append(url)
             kv.put("naver_failed_urls",failed_urls)
 
+@command("!껄무새", cost="cpu")
 def draw_parrot(chat: ChatContext):
     txt = chat.message.param
     img = Image.open(RES_PATH + 'parrot.jpg')
     add_default_text(chat, img, txt)
 
+@command("!멈춰", cost="cpu")
 def draw_stop(chat: ChatContext):
     txt = chat.message.param
     img = Image.open(RES_PATH + 'stop.jpg')
     add_default_text(chat, img, txt)
 
+@command("!진행", cost="cpu")
 def draw_gogo(chat: ChatContext):
     color = '#FFFFFF'
     txt = chat.message.param
@@ -100,6 +91,7 @@ def draw_gogo(chat: ChatContext):
 
     chat.reply_media(img)
 
+@command("!지워", cost="cpu")
 def draw_rmrf(chat: ChatContext):
     color = '#000000'
     txt = chat.message.param
@@ -112,6 +104,7 @@ def draw_rmrf(chat: ChatContext):
 
     chat.reply_media(img)
 
+@command("!말대꾸", cost="cpu")
 def draw_sungmo(chat: ChatContext):
     color = '#000000'
     txt_split = chat.message.param.split("##")
@@ -129,6 +122,7 @@ def draw_sungmo(chat: ChatContext):
     
     chat.reply_media(img)
 
+@command("!텍스트추가", cost="cpu")
 @is_reply
 def add_text(chat: ChatContext):
     src_chat = chat.get_source()
@@ -165,12 +159,12 @@ def add_default_text(chat, img, txt):
     
 def get_image_from_url(url):
     try:
-        response = requests.get(url)
+        response = http.get(url)
     except:
         if url[-3:] == 'jpg':
-            response = requests.get(url[:-3]+'png')
+            response = http.get(url[:-3]+'png')
         elif url[-3:] == 'png':
-            response = requests.get(url[:-3]+'jpg')
+            response = http.get(url[:-3]+'jpg')
     img = Image.open(BytesIO(response.content))
     img = img.convert("RGBA")
     return img
@@ -186,7 +180,7 @@ def get_image_url_from_naver(query):
         'display':'20'
         }
 
-    res = requests.get(url,params=params, headers=headers)
+    res = http.get(url,params=params, headers=headers)
     js = res.json()['items']
     link = []
     if not len(js) == 0:
@@ -1,38 +1,161 @@
 from iris.decorators import *
 from iris import ChatContext, PyKV
+from helper.CommandRouter import command
+import datetime
+import heapq
+import re
+import threading
+import time
 
+import pytz
+
+DURATION_UNITS = {
+    "s": 1, "초": 1,
+    "m": 60, "분": 60,
+    "h": 3600, "시간": 3600,
+    "d": 86400, "일": 86400,
+}
+DURATION_PATTERN = re.compile(r"^(\d+)\s*(s|m|h|d|초|분|시간|일)$")
+
+class BanList:
+    """
+    밴 목록을 메모리 set으로 들고 있고, 바뀔 때만 KV에 씁니다.
+
+    KV 'ban'은 iris.decorators.is_not_banned와 같이 쓰는 user_id 목록이고,
+    기간 밴의 만료 시간은 KV 'ban_expiry'에 [user_id, unix 시간] 목록으로 저장합니다.
+    만료 시간은 힙으로 관리해서 메세지마다 맨 앞 하나만 확인합니다.
+    """
+
+    def __init__(self):
+        self._bans: set | None = None
+        self._expiry: dict = {}
+        self._heap: list = []
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._bans is not None:
+                return
+            kv = PyKV()
+            self._bans = set(kv.get('ban') or [])
+            for user_id, expires_at in kv.get('ban_expiry') or []:
+                if user_id in self._bans:
+                    self._expiry[user_id] = expires_at
+                    self._heap.append((expires_at, user_id))
+            heapq.heapify(self._heap)
+
+    def _save(self):
+        kv = PyKV()
+        kv.put('ban', list(self._bans))
+        kv.put('ban_expiry', [[user_id, expires_at] for user_id, expires_at in self._expiry.items()])
+
+    def _expire(self):
+        if not self._heap or self._heap[0][0] > time.time():
+            return
+        with self._lock:
+            now = time.time()
+            changed = False
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, user_id = heapq.heappop(self._heap)
+                # 밴 해제나 재등록으로 바뀐 만료 시간은 건너뜁니다
+                if self._expiry.get(user_id) == expires_at:
+                    del self._expiry[user_id]
+                    self._bans.discard(user_id)
+                    changed = True
+            if changed:
+                self._save()
+
+    def is_banned(self, user_id) -> bool:
+        if self._bans is None:
+            self._load()
+        self._expire()
+        return user_id in self._bans
+
+    def expires_at(self, user_id) -> float | None:
+        """기간 밴이면 만료 unix 시간, 영구 밴이거나 밴이 아니면 None"""
+        if self._bans is None:
+            self._load()
+        return self._expiry.get(user_id)
+
+    def ban(self, user_id, duration: int | None = None) -> bool:
+        """
+        밴 목록에 추가합니다. duration(초)을 주면 그 시간 뒤에 풀립니다.
+        이미 밴된 사람이면 기간만 바꾸고 False를 반환합니다.
+        """
+        if self._bans is None:
+            self._load()
+        self._expire()
+        with self._lock:
+            added = user_id not in self._bans
+            self._bans.add(user_id)
+            if duration is None:
+                self._expiry.pop(user_id, None)
+            else:
+                expires_at = time.time() + duration
+                self._expiry[user_id] = expires_at
+                heapq.heappush(self._heap, (expires_at, user_id))
+            self._save()
+            return added
+
+    def unban(self, user_id) -> bool:
+        """밴 목록에서 지웁니다. 밴 목록에 없었으면 False"""
+        if self._bans is None:
+            self._load()
+        self._expire()
+        with self._lock:
+            if user_id not in self._bans:
+                return False
+            self._bans.discard(user_id)
+            self._expiry.pop(user_id, None)
+            self._save()
+            return True
+
+ban_list = BanList()
+
+def parse_duration(text: str) -> int | None:
+    """"30m", "2시간", "7d" 같은 기간을 초로 바꿉니다. 형식이 틀리면 None"""
+    match = DURATION_PATTERN.match(text.strip())
+    if not match:
+        return None
+    return int(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+def is_banned(chat: ChatContext):
+    return ban_list.is_banned(chat.sender.id)
+
+def not_banned(chat: ChatContext):
+    return not is_banned(chat)
+
+@command("!밴")
 @is_admin
 @is_reply
 def ban_user(chat: ChatContext):
     replied_chat = chat.get_source()
     reply_user_id = replied_chat.sender.id
     reply_user_name = replied_chat.sender.name
-    kv = PyKV()
-    ban_list = kv.get('ban')
-    if not ban_list:
-        ban_list = []
-    if reply_user_id in ban_list:
+
+    duration = None
+    if chat.message.has_param:
+        duration = parse_duration(chat.message.param)
+        if not duration:
+            chat.reply("사용법: 답장하여 !밴 [기간] (예: 30m, 2h, 7d, 10분, 3시간, 1일)")
+            return
+
+    if not ban_list.ban(reply_user_id, duration) and duration is None:
         chat.reply("이미 밴 등록된 유저입니다.")
-    else:
-        ban_list.append(reply_user_id)
-        print(ban_list)
-        kv.put('ban',ban_list)
+    elif duration is None:
         chat.reply(f"[{reply_user_name}]님을 밴 목록에 등록하였습니다.")
+    else:
+        until = datetime.datetime.fromtimestamp(ban_list.expires_at(reply_user_id), pytz.timezone('Asia/Seoul'))
+        chat.reply(f"[{reply_user_name}]님을 {until.strftime('%m/%d %H:%M')}까지 밴 목록에 등록하였습니다.")
 
+@command("!밴해제")
 @is_admin
 @is_reply
 def unban_user(chat: ChatContext):
     replied_chat = chat.get_source()
     reply_user_id = replied_chat.sender.id
     reply_user_name = replied_chat.sender.name
-    kv = PyKV()
-    ban_list = kv.get('ban')
-    if not ban_list:
-        ban_list = []
-    if reply_user_id in ban_list:
-        ban_list.remove(reply_user_id)
-        kv.put('ban',ban_list)
+    if ban_list.unban(reply_user_id):
         chat.reply(f"[{reply_user_name}]님을 밴 목록에서 삭제하였습니다.")
-        print(kv.get('ban'))
     else:
-        chat.reply("밴 목록에 없는 유저입니다.")
\ No newline at end of file
+        chat.reply("밴 목록에 없는 유저입니다.")
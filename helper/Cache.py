@@ -0,0 +1,78 @@
+"""
+메모리 캐시 모듈
+
+만료 시간(TTL)과 최대 크기(LRU)를 가진 스레드 안전 캐시입니다.
+"""
+from collections import OrderedDict
+import threading
+import time
+import typing as t
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Args:
+        ttl: 기본 만료 시간(초)
+        maxsize: 최대 항목 수. 넘으면 가장 오래 쓰지 않은 항목부터 지웁니다. None이면 제한 없음
+    """
+
+    def __init__(self, ttl: float, maxsize: int | None = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if time.monotonic() < expires_at:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value, ttl: float | None = None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._data.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader: t.Callable[[], t.Any], ttl: float | None = None):
+        """캐시에 없으면 loader()를 호출해서 저장합니다. loader가 예외를 던지면 저장하지 않습니다."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = loader()
+        self.put(key, value, ttl)
+        return value
+
+    def invalidate(self, key=_MISSING):
+        """key를 지웁니다. key를 주지 않으면 전부 지웁니다."""
+        with self._lock:
+            if key is _MISSING:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,179 @@
+"""
+코인 환산 그래프 모듈
+
+바이낸스/업비트 시세 캐시(binance_tickers, upbit_tickers)에 들어 있는 키로 자산 간 그래프를 만들고,
+주요 자산(USDT, KRW, BTC, ETH, BNB)까지의 최단 경로를 미리 계산합니다.
+나머지 쌍은 처음 물어볼 때 한 번 계산해서 캐시에 새 키가 생길 때까지 재사용합니다.
+경로에는 어떤 시세를 곱할지만 저장하고, 환율은 환산할 때 캐시의 현재 시세로 계산합니다.
+실시간 스트림(COIN_STREAM=1)이 켜져 있으면 캐시에 전체 시세가 있으므로 요청 없이 바로 환산합니다.
+"""
+from dataclasses import dataclass
+import heapq
+import math
+import threading
+
+from helper.CoinMarket import Ticker, TickerCache, binance_tickers, market_catalog, upbit_tickers
+
+# 바이낸스 심볼을 기준/호가 자산으로 나눌 때 쓰는 호가 자산 (긴 것부터 맞춤)
+QUOTE_ASSETS = sorted([
+    "USDT", "USDC", "FDUSD", "TUSD", "BUSD", "DAI", "USD1", "AEUR",
+    "BTC", "ETH", "BNB", "XRP", "TRX", "DOGE", "SOL",
+    "EUR", "TRY", "BRL", "JPY", "ARS", "MXN", "PLN", "RON", "ZAR", "UAH", "IDR", "COP", "CZK",
+], key=len, reverse=True)
+HUBS = ("USDT", "KRW", "BTC", "ETH", "BNB")
+
+# 홉 수가 같으면 바이낸스 쌍을 먼저 씁니다
+BINANCE_WEIGHT = 1.0
+UPBIT_WEIGHT = 1.01
+
+# 경로 한 단계: (시세 캐시, 키, 역수 여부). 역수면 quote -> base 방향입니다.
+Step = tuple[TickerCache, str, bool]
+
+
+@dataclass(frozen=True)
+class Route:
+    path: tuple[str, ...]
+    steps: tuple[Step, ...]
+
+    def reversed(self) -> "Route":
+        return Route(self.path[::-1], tuple((cache, key, not inverse) for cache, key, inverse in reversed(self.steps)))
+
+
+@dataclass(frozen=True)
+class Conversion:
+    base: str
+    quote: str
+    rate: float
+    path: tuple[str, ...]
+    tickers: tuple[Ticker, ...]
+
+
+def split_symbol(symbol: str) -> tuple[str, str] | None:
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    return None
+
+
+def pair_symbols(base: str, quote: str) -> tuple[list[str], list[str]]:
+    """
+    base/quote 환산에 필요한 시세 키
+
+    Returns:
+        (바이낸스 심볼, 업비트 마켓). 직접 쌍, 양쪽의 USDT 쌍, 김프 계산용 BTC 시세이고,
+        업비트는 상장된 원화 마켓만 넣습니다.
+    """
+    symbols = [base + quote, quote + base, "BTCUSDT"]
+    symbols += [asset + "USDT" for asset in (base, quote) if asset not in ("USDT", "KRW")]
+    markets = ["KRW-BTC", "KRW-USDT"]
+    markets += [f"KRW-{asset}" for asset in (base, quote) if asset != "KRW" and market_catalog.has(f"KRW-{asset}")]
+    return list(dict.fromkeys(symbols)), list(dict.fromkeys(markets))
+
+
+def shortest_routes(edges: dict[str, list[tuple[str, float, Step]]], source: str) -> dict[str, Route]:
+    """source에서 모든 자산까지의 경로. 가중치가 작은 경로를 고릅니다."""
+    best: dict[str, float] = {source: 0.0}
+    result: dict[str, Route] = {}
+    queue = [(0.0, source, (source,), ())]
+    while queue:
+        cost, node, path, steps = heapq.heappop(queue)
+        if node in result:
+            continue
+        result[node] = Route(path, steps)
+        for neighbor, weight, step in edges.get(node, ()):
+            next_cost = cost + weight
+            if neighbor not in result and next_cost < best.get(neighbor, float("inf")):
+                best[neighbor] = next_cost
+                heapq.heappush(queue, (next_cost, neighbor, path + (neighbor,), steps + (step,)))
+    return result
+
+
+class ConversionGraph:
+    """
+    Args:
+        binance: 바이낸스 시세 캐시
+        upbit: 업비트 시세 캐시
+    """
+
+    def __init__(self, binance: TickerCache = binance_tickers, upbit: TickerCache = upbit_tickers):
+        self.binance = binance
+        self.upbit = upbit
+        self.versions = (-1, -1)
+        self.edges: dict[str, list[tuple[str, float, Step]]] = {}
+        self._routes: dict[tuple[str, str], Route | None] = {}
+        self._lock = threading.Lock()
+
+    def _current_versions(self) -> tuple[int, int]:
+        return self.binance.key_version, self.upbit.key_version
+
+    def _ensure_built(self):
+        if self.versions == self._current_versions():
+            return
+        with self._lock:
+            if self.versions != self._current_versions():
+                self.build()
+
+    def build(self):
+        """캐시에 있는 키로 그래프와 주요 자산 경로를 새로 만듭니다."""
+        versions = self._current_versions()
+        edges: dict[str, list[tuple[str, float, Step]]] = {}
+
+        def add(base: str, quote: str, cache: TickerCache, key: str, weight: float):
+            edges.setdefault(base, []).append((quote, weight, (cache, key, False)))
+            edges.setdefault(quote, []).append((base, weight, (cache, key, True)))
+
+        for symbol in self.binance.keys():
+            pair = split_symbol(symbol)
+            if pair:
+                add(pair[0], pair[1], self.binance, symbol, BINANCE_WEIGHT)
+        for market in self.upbit.keys():
+            quote, _, base = market.partition("-")
+            add(base, quote, self.upbit, market, UPBIT_WEIGHT)
+
+        routes: dict[tuple[str, str], Route | None] = {}
+        for hub in HUBS:
+            if hub not in edges:
+                continue
+            for node, route in shortest_routes(edges, hub).items():
+                routes[(hub, node)] = route
+                routes[(node, hub)] = route.reversed()
+
+        # 참조를 한 번에 바꿔서 읽는 쪽은 항상 같은 시점의 그래프를 봅니다
+        self.edges, self._routes, self.versions = edges, routes, versions
+
+    def route(self, base: str, quote: str) -> Route | None:
+        self._ensure_built()
+        routes = self._routes
+        key = (base, quote)
+        if key not in routes:
+            routes[key] = shortest_routes(self.edges, base).get(quote)
+        return routes[key]
+
+    def convert(self, base: str, quote: str) -> Conversion | None:
+        """1 base가 몇 quote인지 캐시의 현재 시세로 계산합니다. 연결되지 않으면 None"""
+        base, quote = base.upper(), quote.upper()
+        if base == quote:
+            return Conversion(base, quote, 1.0, (base,), ())
+        route = self.route(base, quote)
+        if route is None:
+            return None
+        rate = 1.0
+        tickers = []
+        for cache, key, inverse in route.steps:
+            ticker = cache.peek(key)
+            if ticker is None or ticker.price <= 0:
+                return None
+            rate *= 1 / ticker.price if inverse else ticker.price
+            tickers.append(ticker)
+        return Conversion(base, quote, rate, route.path, tuple(tickers))
+
+
+def format_rate(rate: float) -> str:
+    """환율 표시. 1보다 작으면 유효숫자 6자리까지 소수로 씁니다."""
+    if rate >= 1:
+        return f"{rate:,.4f}".rstrip("0").rstrip(".")
+    decimals = min(5 - math.floor(math.log10(rate)), 20)
+    return f"{rate:.{decimals}f}".rstrip("0").rstrip(".")
+
+
+conversion_graph = ConversionGraph()
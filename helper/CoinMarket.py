@@ -0,0 +1,383 @@
+"""
+코인 시세 데이터 모듈
+
+업비트 마켓 목록을 캐시하고 심볼/한글 이름 인덱스를 만들어서
+명령어마다 /v1/market/all 을 받지 않도록 합니다.
+시세는 짧은 TTL 캐시에 두고, 동시에 들어온 요청의 심볼을 모아서 한 번에 받습니다.
+바이낸스도 필요한 심볼만 symbols= 로 받습니다.
+여러 거래소 값이 필요한 명령어는 gather()로 동시에 받고, 늦는 쪽은 마지막 값을 씁니다.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import json
+import os
+import threading
+import time
+import typing as t
+
+from helper.HttpClient import http
+
+UPBIT_MARKET_URL = "https://api.upbit.com/v1/market/all"
+UPBIT_TICKER_URL = "https://api.upbit.com/v1/ticker"
+BINANCE_TICKER_URL = "https://api.binance.com/api/v3/ticker/24hr"
+MARKET_TTL = int(os.getenv("COIN_MARKET_TTL") or 3600)
+TICKER_TTL = float(os.getenv("COIN_TICKER_TTL") or 1)
+TICKER_WAIT = 10
+# 거래소가 돌려주지 않은 심볼은 이 시간(초) 동안 다시 요청하지 않습니다
+ABSENT_TTL = 600
+SOURCE_DEADLINE = float(os.getenv("COIN_SOURCE_DEADLINE") or 2)
+
+
+@dataclass(frozen=True)
+class Market:
+    """업비트 마켓 하나 (예: KRW-BTC)"""
+    market: str
+    korean_name: str
+    english_name: str
+
+    @property
+    def quote(self) -> str:
+        return self.market.split("-", 1)[0]
+
+    @property
+    def symbol(self) -> str:
+        return self.market.split("-", 1)[1]
+
+
+class MarketCatalog:
+    """
+    업비트 마켓 목록 캐시
+
+    처음 쓸 때 한 번 받아오고, 그 뒤로는 백그라운드 스레드가 ttl마다 새로 받습니다.
+    원화 마켓은 심볼 -> 마켓, 한글 이름의 모든 부분 문자열 -> 심볼 목록으로 인덱싱합니다.
+
+    Args:
+        ttl: 새로 받는 주기(초)
+    """
+
+    def __init__(self, ttl: float = MARKET_TTL):
+        self.ttl = ttl
+        self.updated_at = 0.0
+        self.markets: dict[str, Market] = {}
+        self.krw: dict[str, Market] = {}
+        self._names: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
+        self._refresher: threading.Thread | None = None
+
+    def _ensure_loaded(self):
+        if self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher is not None:
+                return
+            self.refresh()
+            self._refresher = threading.Thread(target=self._refresh_loop, name="market-catalog", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.ttl)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[CoinMarket] 업비트 마켓 목록을 갱신하지 못했습니다: {e}")
+
+    def refresh(self):
+        """마켓 목록을 받아서 인덱스를 새로 만듭니다. 실패하면 예외를 그대로 던지고 기존 인덱스를 유지합니다."""
+        response = http.get(UPBIT_MARKET_URL)
+        response.raise_for_status()
+
+        markets = {}
+        krw = {}
+        names: dict[str, list[str]] = {}
+        for item in response.json():
+            market = Market(item["market"], item.get("korean_name", ""), item.get("english_name", ""))
+            markets[market.market] = market
+            if market.quote != "KRW":
+                continue
+            krw[market.symbol] = market
+            name = market.korean_name
+            for start in range(len(name)):
+                for end in range(start + 1, len(name) + 1):
+                    symbols = names.setdefault(name[start:end], [])
+                    if market.symbol not in symbols:
+                        symbols.append(market.symbol)
+
+        # 같은 글자를 포함하는 코인이 여러 개면 이름이 그 글자로 시작하고 짧은 쪽을 먼저
+        for part, symbols in names.items():
+            symbols.sort(key=lambda s: (not krw[s].korean_name.startswith(part), len(krw[s].korean_name), s))
+
+        # 참조를 한 번에 바꿔서 읽는 쪽은 잠금 없이 항상 완성된 인덱스를 봅니다
+        self.markets, self.krw, self._names = markets, krw, names
+        self.updated_at = time.time()
+
+    def krw_markets(self) -> list[Market]:
+        """원화 마켓 목록"""
+        self._ensure_loaded()
+        return list(self.krw.values())
+
+    def has(self, market: str) -> bool:
+        self._ensure_loaded()
+        return market in self.markets
+
+    def resolve(self, query: str) -> Market | None:
+        """
+        영문 심볼이나 한글 이름(일부)으로 원화 마켓을 찾습니다.
+
+        예: "btc", "비트코인", "비트" -> KRW-BTC
+        """
+        self._ensure_loaded()
+        query = query.strip()
+        market = self.krw.get(query.upper())
+        if market:
+            return market
+        symbols = self._names.get(query)
+        if symbols:
+            return self.krw[symbols[0]]
+        return None
+
+
+@dataclass(frozen=True)
+class Ticker:
+    """
+    시세 하나
+
+    Args:
+        key: 업비트 마켓 코드 (예: KRW-BTC) 또는 바이낸스 심볼 (예: BTCUSDT)
+        price: 현재가
+        change: 등락률(%)
+        fetched_at: 받은 시각 (unix 시간)
+    """
+    key: str
+    price: float
+    change: float
+    fetched_at: float
+
+    @property
+    def age(self) -> float:
+        """받은 지 몇 초 지났는지"""
+        return max(time.time() - self.fetched_at, 0.0)
+
+
+class TickerCache:
+    """
+    짧은 TTL 시세 캐시
+
+    만료된 심볼은 대기 목록에 모아 두었다가, 받는 중인 요청이 없을 때 한 번에 받습니다.
+    받는 중에 들어온 호출은 그 요청이 끝나기를 기다린 뒤 다음 묶음에 합류합니다.
+    거래소가 돌려주지 않은 심볼은 ABSENT_TTL 동안 다시 요청하지 않습니다.
+
+    Args:
+        fetch: 심볼 목록 -> Ticker 목록 함수
+        ttl: 시세 유효 시간(초)
+    """
+
+    def __init__(self, fetch: t.Callable[[list[str]], list[Ticker]], ttl: float = TICKER_TTL):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.fetches = 0
+        self.fetched_keys = 0
+        self.hits = 0
+        self.key_version = 0
+        self._table: dict[str, Ticker] = {}
+        self._absent: dict[str, float] = {}
+        self._pending: set[str] = set()
+        self._inflight: threading.Event | None = None
+        self._lock = threading.Lock()
+        self.listeners: list[t.Callable[[list[Ticker]], None]] = []
+
+    def update(self, tickers: t.Iterable[Ticker]):
+        """시세를 넣고, 등록된 리스너(가격 알림 등)에 새 시세를 알립니다."""
+        tickers = list(tickers)
+        with self._lock:
+            for ticker in tickers:
+                if ticker.key not in self._table:
+                    self.key_version += 1
+                self._table[ticker.key] = ticker
+        for listener in self.listeners:
+            try:
+                listener(tickers)
+            except Exception as e:
+                print(f"[CoinMarket] 시세 리스너 오류: {e}")
+
+    def peek(self, key: str) -> Ticker | None:
+        """만료 여부와 상관없이 마지막으로 받은 시세"""
+        return self._table.get(key)
+
+    def keys(self) -> list[str]:
+        """시세를 한 번이라도 받은 키 목록. 새 키가 생길 때마다 key_version이 올라갑니다."""
+        with self._lock:
+            return list(self._table)
+
+    def peek_many(self, keys: t.Iterable[str]) -> dict[str, Ticker] | None:
+        """마지막으로 받은 시세들. 하나라도 없으면 None"""
+        tickers = {key: self._table.get(key) for key in keys}
+        if None in tickers.values():
+            return None
+        return tickers
+
+    def get(self, key: str) -> Ticker | None:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: t.Iterable[str]) -> dict[str, Ticker]:
+        """
+        시세를 가져옵니다. TTL 안의 시세는 캐시에서, 나머지는 묶어서 한 번에 받습니다.
+
+        Returns:
+            키 -> Ticker. 거래소가 돌려주지 않은 키는 빠지고,
+            다른 호출이 받는 요청이 끝나지 않으면 만료된 시세가 들어 있을 수 있습니다.
+        """
+        keys = list(dict.fromkeys(keys))
+        for _ in range(3):
+            with self._lock:
+                now = time.time()
+                missing = [
+                    key for key in keys
+                    if (key not in self._table or now - self._table[key].fetched_at >= self.ttl)
+                    and self._absent.get(key, 0) <= now
+                ]
+                if not missing:
+                    self.hits += 1
+                    break
+                self._pending.update(missing)
+                if self._inflight is None:
+                    batch = sorted(self._pending)
+                    self._pending.clear()
+                    inflight = self._inflight = threading.Event()
+                    leader = True
+                else:
+                    inflight = self._inflight
+                    leader = False
+
+            if not leader:
+                inflight.wait(TICKER_WAIT)
+                continue
+
+            try:
+                tickers = self.fetch(batch)
+                with self._lock:
+                    self.fetches += 1
+                    self.fetched_keys += len(batch)
+                    returned = {ticker.key for ticker in tickers}
+                    now = time.time()
+                    if len(self._absent) > 1000:
+                        self._absent = {key: until for key, until in self._absent.items() if until > now}
+                    absent_until = now + ABSENT_TTL
+                    for key in batch:
+                        if key not in returned:
+                            self._absent[key] = absent_until
+                self.update(tickers)
+            finally:
+                with self._lock:
+                    self._inflight = None
+                inflight.set()
+            break
+
+        return {key: self._table[key] for key in keys if key in self._table}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._table),
+                "hits": self.hits,
+                "fetches": self.fetches,
+                "keys_per_fetch": self.fetched_keys / self.fetches if self.fetches else 0.0,
+            }
+
+
+def fetch_upbit_tickers(markets: list[str]) -> list[Ticker]:
+    response = http.get(UPBIT_TICKER_URL, params={"markets": ",".join(markets)})
+    response.raise_for_status()
+    fetched_at = time.time()
+    return [
+        Ticker(item["market"], item["trade_price"], item["signed_change_rate"] * 100, fetched_at)
+        for item in response.json()
+    ]
+
+
+def fetch_binance_tickers(symbols: list[str]) -> list[Ticker]:
+    """
+    필요한 심볼의 24시간 시세만 받습니다.
+    없는 심볼이 하나라도 있으면 바이낸스가 요청 전체를 거절하므로, 그때는 심볼별로 다시 받아서 없는 심볼만 뺍니다.
+    """
+    response = http.get(BINANCE_TICKER_URL, params={"symbols": json.dumps(symbols, separators=(",", ":"))})
+    if response.status_code == 400 and len(symbols) > 1:
+        tickers = []
+        for symbol in symbols:
+            tickers.extend(fetch_binance_tickers([symbol]))
+        return tickers
+    if response.status_code == 400:
+        return []
+    response.raise_for_status()
+
+    fetched_at = time.time()
+    return [
+        Ticker(item["symbol"], float(item["lastPrice"]), float(item["priceChangePercent"]), fetched_at)
+        for item in response.json()
+    ]
+
+
+def format_age(tickers: t.Iterable[Ticker]) -> str:
+    """시세 중 가장 오래된 것 기준 "n초 전" 표시"""
+    ages = [ticker.age for ticker in tickers]
+    if not ages:
+        return ""
+    oldest = max(ages)
+    if oldest < 60:
+        return f"{oldest:.1f}초 전 시세"
+    return f"{oldest / 60:.0f}분 전 시세"
+
+
+@dataclass(frozen=True)
+class Source:
+    """
+    gather()에 넘기는 값 출처 하나
+
+    Args:
+        fetch: 새 값을 가져오는 함수
+        fallback: fetch가 늦거나 실패하면 대신 쓸 마지막 값을 돌려주는 함수
+        deadline: 기다릴 최대 시간(초)
+    """
+    fetch: t.Callable[[], t.Any]
+    fallback: t.Callable[[], t.Any] | None = None
+    deadline: float = SOURCE_DEADLINE
+
+
+@dataclass(frozen=True)
+class SourceResult:
+    value: t.Any
+    stale: bool
+
+
+_source_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="coin-source")
+
+
+def gather(sources: dict[str, Source]) -> dict[str, SourceResult]:
+    """
+    출처들을 동시에 가져옵니다. 출처마다 deadline 안에 오지 않거나 실패하면 fallback 값을 stale로 표시해서 씁니다.
+
+    Raises:
+        LookupError: fallback 값도 없는 출처가 있으면
+    """
+    started = time.monotonic()
+    futures = {name: _source_executor.submit(source.fetch) for name, source in sources.items()}
+    results = {}
+    for name, future in futures.items():
+        source = sources[name]
+        try:
+            value = future.result(timeout=max(source.deadline - (time.monotonic() - started), 0))
+            if value is None:
+                raise LookupError(f"{name} 값이 없습니다")
+            results[name] = SourceResult(value, False)
+        except Exception as e:
+            value = source.fallback() if source.fallback else None
+            if value is None:
+                raise LookupError(f"{name} 값을 가져오지 못했습니다") from e
+            print(f"[CoinMarket] {name} 응답이 늦거나 실패해서 마지막 값을 씁니다 ({type(e).__name__})")
+            results[name] = SourceResult(value, True)
+    return results
+
+
+market_catalog = MarketCatalog()
+upbit_tickers = TickerCache(fetch_upbit_tickers)
+binance_tickers = TickerCache(fetch_binance_tickers)
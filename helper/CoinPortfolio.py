@@ -0,0 +1,176 @@
+"""
+코인 보유 내역 모듈
+
+보유 내역을 심볼/수량/평균단가 열 배열로 저장하고, 시세 표와 NumPy 한 번으로 평가합니다.
+KV 'coin.<user_id>' 에 {"symbol": [...], "amount": [...], "average": [...]} 형태로 저장하며,
+예전 {심볼: {"amount", "average"}} 형태도 읽을 수 있습니다.
+"""
+from dataclasses import dataclass
+import typing as t
+
+import numpy as np
+from iris import PyKV
+
+
+@dataclass
+class Valuation:
+    """보유 내역 평가 결과. 배열은 시세가 있는 코인만, 같은 순서로 들어 있습니다."""
+    symbols: list[str]
+    price: np.ndarray
+    change: np.ndarray
+    amount: np.ndarray
+    average: np.ndarray
+    seed: np.ndarray
+    total: np.ndarray
+    percent: np.ndarray
+
+    @property
+    def current_total(self) -> float:
+        return float(self.total.sum())
+
+    @property
+    def bought_total(self) -> float:
+        return float(self.seed.sum())
+
+    @property
+    def total_change(self) -> float:
+        bought = self.bought_total
+        return (self.current_total / bought - 1) * 100 if bought else 0.0
+
+
+class Portfolio:
+    def __init__(self, symbols: list[str] | None = None, amount=None, average=None):
+        self.symbols = list(symbols or [])
+        self.amount = np.asarray(amount if amount is not None else [], dtype=np.float64)
+        self.average = np.asarray(average if average is not None else [], dtype=np.float64)
+
+    @classmethod
+    def from_kv(cls, value) -> "Portfolio":
+        if not value:
+            return cls()
+        if "symbol" in value:
+            return cls(value["symbol"], value["amount"], value["average"])
+        # 예전 형식: {심볼: {"amount": 수량, "average": 평균단가}}
+        symbols = list(value.keys())
+        return cls(symbols, [value[s]["amount"] for s in symbols], [value[s]["average"] for s in symbols])
+
+    def to_kv(self) -> dict:
+        return {"symbol": self.symbols, "amount": self.amount.tolist(), "average": self.average.tolist()}
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def holding(self, symbol: str) -> tuple[float, float] | None:
+        """(수량, 평균단가) 또는 보유하지 않으면 None"""
+        if symbol not in self.symbols:
+            return None
+        index = self.symbols.index(symbol)
+        return float(self.amount[index]), float(self.average[index])
+
+    def set(self, symbol: str, amount: float, average: float):
+        if symbol in self.symbols:
+            index = self.symbols.index(symbol)
+            self.amount[index] = amount
+            self.average[index] = average
+        else:
+            self.symbols.append(symbol)
+            self.amount = np.append(self.amount, amount)
+            self.average = np.append(self.average, average)
+
+    def remove(self, symbol: str) -> bool:
+        if symbol not in self.symbols:
+            return False
+        index = self.symbols.index(symbol)
+        del self.symbols[index]
+        self.amount = np.delete(self.amount, index)
+        self.average = np.delete(self.average, index)
+        return True
+
+    def markets(self) -> list[str]:
+        return ["KRW-" + symbol for symbol in self.symbols]
+
+    def value(self, tickers: t.Mapping) -> Valuation:
+        """
+        tickers(마켓 코드 -> Ticker)로 평가합니다. 시세가 없는 코인은 빠집니다.
+        """
+        mask = np.array([("KRW-" + symbol) in tickers for symbol in self.symbols], dtype=bool)
+        symbols = [symbol for symbol, has in zip(self.symbols, mask) if has]
+        price = np.array([tickers["KRW-" + symbol].price for symbol in symbols], dtype=np.float64)
+        change = np.array([tickers["KRW-" + symbol].change for symbol in symbols], dtype=np.float64)
+        amount = self.amount[mask]
+        average = self.average[mask]
+
+        seed = average * amount
+        total = np.round(price * amount, 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percent = np.where(seed > 0, np.round((total / seed - 1) * 100, 1), 0.0)
+        return Valuation(symbols, price, change, amount, average, seed, total, percent)
+
+
+def load_portfolio(user_id) -> Portfolio:
+    return Portfolio.from_kv(PyKV().get(f"coin.{str(user_id)}"))
+
+
+def save_portfolio(user_id, portfolio: Portfolio):
+    PyKV().put(f"coin.{str(user_id)}", portfolio.to_kv())
+
+
+def register_room_member(room_id, user_id, name: str):
+    """!코인랭킹에 나오도록 방별 등록자 목록(KV 'coin.room.<room_id>')에 추가합니다."""
+    kv = PyKV()
+    key = f"coin.room.{str(room_id)}"
+    members = kv.get(key) or {}
+    if members.get(str(user_id)) != name:
+        members[str(user_id)] = name
+        kv.put(key, members)
+
+
+def room_members(room_id) -> dict[str, str]:
+    """user_id -> 이름"""
+    return PyKV().get(f"coin.room.{str(room_id)}") or {}
+
+
+@dataclass
+class RankEntry:
+    user_id: str
+    name: str
+    current_total: float
+    bought_total: float
+    percent: float
+
+
+def rank_portfolios(portfolios: dict[str, tuple[str, Portfolio]], tickers: t.Mapping) -> list[RankEntry]:
+    """
+    여러 사람의 보유 내역을 한 배열로 이어 붙여서 한 번에 평가하고 수익률 순으로 정렬합니다.
+
+    Args:
+        portfolios: user_id -> (이름, Portfolio)
+        tickers: 마켓 코드 -> Ticker
+    """
+    owners, amounts, averages, prices = [], [], [], []
+    user_ids = list(portfolios.keys())
+    for index, user_id in enumerate(user_ids):
+        portfolio = portfolios[user_id][1]
+        for symbol, amount, average in zip(portfolio.symbols, portfolio.amount, portfolio.average):
+            ticker = tickers.get("KRW-" + symbol)
+            if ticker is None:
+                continue
+            owners.append(index)
+            amounts.append(amount)
+            averages.append(average)
+            prices.append(ticker.price)
+
+    owners = np.asarray(owners, dtype=np.intp)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    seed = np.bincount(owners, weights=np.asarray(averages, dtype=np.float64) * amounts, minlength=len(user_ids))
+    total = np.bincount(owners, weights=np.round(np.asarray(prices, dtype=np.float64) * amounts, 0), minlength=len(user_ids))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent = np.where(seed > 0, (total / seed - 1) * 100, np.nan)
+
+    entries = [
+        RankEntry(user_id, portfolios[user_id][0], float(total[i]), float(seed[i]), float(percent[i]))
+        for i, user_id in enumerate(user_ids)
+        if not np.isnan(percent[i])
+    ]
+    entries.sort(key=lambda entry: entry.percent, reverse=True)
+    return entries
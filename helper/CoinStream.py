@@ -0,0 +1,191 @@
+"""
+거래소 실시간 시세 스트림 모듈 (선택 기능)
+
+업비트, 바이낸스 WebSocket 시세를 받아서 helper.CoinMarket의 시세 캐시에 바로 넣습니다.
+스트림이 연결되어 있는 동안 코인 명령어는 REST 요청 없이 메모리의 시세를 읽습니다.
+연결이 끊기면 점점 길게 기다렸다가 다시 연결하고, 그동안은 REST로 돌아갑니다.
+
+COIN_STREAM=1 로 켜고, websocket-client 패키지가 필요합니다.
+COIN_STREAM_RECORD=<파일> 을 주면 받은 메세지를 기록하고, ReplayFeed로 다시 재생할 수 있습니다.
+"""
+import json
+import os
+import threading
+import time
+import typing as t
+import uuid
+
+from helper.CoinMarket import Ticker, TickerCache, binance_tickers, market_catalog, upbit_tickers
+
+UPBIT_STREAM_URL = "wss://api.upbit.com/websocket/v1"
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/ws/!miniTicker@arr"
+
+# 연결되어 있으면 메세지가 없는 동안 가격이 그대로인 것이므로 시세를 더 오래 믿습니다
+STREAM_TTL = float(os.getenv("COIN_STREAM_TTL") or 60)
+RECONNECT_MIN = 1
+RECONNECT_MAX = 60
+RECV_TIMEOUT = 30
+
+
+def parse_upbit(message) -> list[Ticker]:
+    data = json.loads(message)
+    if data.get("type") != "ticker":
+        return []
+    return [Ticker(data["code"], data["trade_price"], data["signed_change_rate"] * 100, time.time())]
+
+
+def parse_binance(message) -> list[Ticker]:
+    data = json.loads(message)
+    fetched_at = time.time()
+    tickers = []
+    for item in data if isinstance(data, list) else [data]:
+        close, open_ = float(item["c"]), float(item["o"])
+        change = (close / open_ - 1) * 100 if open_ else 0.0
+        tickers.append(Ticker(item["s"], close, change, fetched_at))
+    return tickers
+
+
+def websocket_messages(url: str, subscribe: t.Callable[[], t.Any] | None = None) -> t.Iterator:
+    """WebSocket에 연결해서 받은 메세지를 하나씩 돌려줍니다. 연결이 끊기면 예외를 던집니다."""
+    import websocket
+
+    ws = websocket.create_connection(url, timeout=RECV_TIMEOUT)
+    try:
+        if subscribe is not None:
+            ws.send(json.dumps(subscribe()))
+        while True:
+            yield ws.recv()
+    finally:
+        ws.close()
+
+
+def upbit_subscription() -> list[dict]:
+    codes = [market.market for market in market_catalog.krw_markets()]
+    return [{"ticket": str(uuid.uuid4())}, {"type": "ticker", "codes": codes}]
+
+
+class ReplayFeed:
+    """
+    기록된 메세지 파일을 WebSocket 대신 재생합니다. (테스트, 장애 재현용)
+
+    파일은 한 줄에 {"t": 처음 메세지부터 지난 초, "data": 메세지} 입니다.
+    끝까지 재생하면 연결이 끊긴 것처럼 끝나므로 StreamFeed가 다시 처음부터 재생합니다.
+
+    Args:
+        path: 기록 파일 경로
+        speed: 재생 속도 배율. 0이면 기다리지 않고 바로 재생합니다.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0):
+        self.path = path
+        self.speed = speed
+
+    def __call__(self) -> t.Iterator:
+        started = time.monotonic()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if self.speed:
+                    delay = record.get("t", 0) / self.speed - (time.monotonic() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                yield record["data"]
+
+
+class StreamFeed:
+    """
+    메세지 스트림 하나를 받아서 시세 캐시를 갱신하는 백그라운드 작업
+
+    Args:
+        name: 로그에 쓰는 이름
+        cache: 갱신할 시세 캐시
+        connect: 호출하면 메세지 반복자를 돌려주는 함수 (WebSocket 또는 ReplayFeed)
+        parse: 메세지 -> Ticker 목록
+        live_ttl: 연결되어 있는 동안 캐시에 적용할 TTL
+        record_to: 받은 메세지를 기록할 파일 경로
+    """
+
+    def __init__(self, name: str, cache: TickerCache, connect: t.Callable[[], t.Iterable], parse: t.Callable[[t.Any], list[Ticker]],
+                 live_ttl: float = STREAM_TTL, record_to: str | None = None):
+        self.name = name
+        self.cache = cache
+        self.connect = connect
+        self.parse = parse
+        self.live_ttl = live_ttl
+        self.record_to = record_to
+        self.base_ttl = cache.ttl
+        self.live = False
+        self.messages = 0
+        self.reconnects = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name=f"stream-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        backoff = RECONNECT_MIN
+        while not self._stop.is_set():
+            try:
+                record = open(self.record_to, "a", encoding="utf-8") if self.record_to else None
+                started = time.monotonic()
+                try:
+                    for message in self.connect():
+                        if self._stop.is_set():
+                            break
+                        tickers = self.parse(message)
+                        if tickers:
+                            self.cache.update(tickers)
+                            self.messages += 1
+                            if not self.live:
+                                print(f"[CoinStream] {self.name} 스트림 연결됨")
+                                self._set_live(True)
+                            backoff = RECONNECT_MIN
+                        if record:
+                            data = message.decode("utf-8") if isinstance(message, bytes) else message
+                            record.write(json.dumps({"t": round(time.monotonic() - started, 3), "data": data}, ensure_ascii=False) + "\n")
+                finally:
+                    if record:
+                        record.close()
+            except Exception as e:
+                print(f"[CoinStream] {self.name} 스트림 오류: {e}")
+            finally:
+                self._set_live(False)
+
+            if self._stop.is_set():
+                break
+            self.reconnects += 1
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX)
+
+    def _set_live(self, live: bool):
+        self.live = live
+        self.cache.ttl = max(self.live_ttl, self.base_ttl) if live else self.base_ttl
+
+
+feeds: list[StreamFeed] = []
+
+
+def start_streams(record_to: str | None = os.getenv("COIN_STREAM_RECORD")) -> list[StreamFeed]:
+    """업비트, 바이낸스 스트림을 시작합니다."""
+    try:
+        import websocket  # noqa: F401
+    except ImportError:
+        print("[CoinStream] websocket-client 패키지가 없어 실시간 시세를 사용하지 않습니다 (pip install websocket-client)")
+        return []
+
+    feeds.extend([
+        StreamFeed("upbit", upbit_tickers, lambda: websocket_messages(UPBIT_STREAM_URL, upbit_subscription), parse_upbit,
+                   record_to=f"{record_to}.upbit" if record_to else None).start(),
+        StreamFeed("binance", binance_tickers, lambda: websocket_messages(BINANCE_STREAM_URL), parse_binance,
+                   record_to=f"{record_to}.binance" if record_to else None).start(),
+    ])
+    return feeds
@@ -0,0 +1,225 @@
+"""
+명령어 라우터 모듈
+
+bots/ 아래 모듈은 @command 데코레이터로 명령어와 별칭을 한 번만 선언하고,
+irispy.py는 메시지 한 건당 dict 조회 한 번으로 핸들러를 찾습니다.
+
+discover()는 모듈을 import하지 않고 소스의 @command 선언만 읽어서 등록하고,
+실제 모듈은 해당 명령어가 처음 호출될 때 불러옵니다.
+"""
+from dataclasses import dataclass
+from pathlib import Path
+import ast
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+import typing as t
+
+
+@dataclass
+class Command:
+    """등록된 명령어 정보. handler가 None이면 아직 모듈을 불러오지 않은 상태입니다."""
+    name: str
+    handler: t.Callable | None
+    module: str
+    aliases: tuple = ()
+    inject: tuple = ()
+    guarded: bool = True
+    cost: str = "fast"
+    shared: bool = False
+
+
+def make_command(handler, module, name, *, aliases=(), inject=(), guarded=True, cost="fast", shared=False):
+    return Command(
+        name=name,
+        handler=handler,
+        module=module,
+        aliases=tuple(aliases),
+        inject=tuple(inject),
+        guarded=guarded,
+        cost=cost,
+        shared=shared,
+    )
+
+
+class CommandRouter:
+    """명령어 -> 핸들러 테이블"""
+
+    def __init__(self, prefix: str = "!"):
+        self.prefix = prefix
+        self.commands: dict[str, Command] = {}
+        self.guards: list[t.Callable] = []
+        self.context: dict[str, t.Any] = {}
+        self.pending: set[str] = set()
+        self.load_times: dict[str, float] = {}
+        self.discover_time = 0.0
+        self._load_lock = threading.RLock()
+
+    def command(self, name: str, **options):
+        """
+        명령어 등록 데코레이터
+
+        discover()가 소스에서 인자를 읽으므로 인자는 리터럴로만 적어야 합니다.
+
+        Args:
+            name: 대표 명령어 (예: "!코인")
+            aliases: 같은 핸들러로 연결할 별칭 목록
+            inject: 핸들러에 키워드 인자로 넘길 context 키 목록 (예: ("kl",))
+            guarded: False면 밴 체크 등 guard를 건너뜁니다
+            cost: 실행할 워커 풀 등급 (fast, network, cpu, eval)
+            shared: True면 응답이 보낸 사람과 무관하므로 같은 방의 같은 메시지를 하나로 합칩니다
+        """
+        # iris.decorators는 functools.wraps를 쓰지 않으므로 선언한 모듈을 직접 기록
+        module = sys._getframe(1).f_globals.get("__name__", "")
+
+        def decorator(func: t.Callable):
+            self.register(make_command(func, module, name, **options))
+            return func
+
+        return decorator
+
+    def register(self, cmd: Command):
+        for key in (cmd.name, *cmd.aliases):
+            if not key.startswith(self.prefix):
+                raise ValueError(f"명령어는 {self.prefix}로 시작해야 합니다: {key}")
+            registered = self.commands.get(key)
+            if registered and registered.handler is not None and registered.handler is not cmd.handler:
+                raise ValueError(f"중복된 명령어입니다: {key} ({registered.module}, {cmd.module})")
+            self.commands[key] = cmd
+
+    def discover(self, modules: list[str]):
+        """
+        모듈의 @command 선언을 import 없이 등록합니다.
+        이미 불러온 모듈은 건너뛰고, 선언을 읽을 수 없는 모듈은 바로 불러옵니다.
+        """
+        started = time.perf_counter()
+        for name in modules:
+            if name in sys.modules:
+                continue
+            try:
+                commands = self._scan(name)
+            except (OSError, SyntaxError, ValueError) as e:
+                print(f"[CommandRouter] {name} 선언을 읽을 수 없어 바로 불러옵니다 ({e})")
+                self.load(name)
+                continue
+
+            self.pending.add(name)
+            for cmd in commands:
+                self.register(cmd)
+        self.discover_time = time.perf_counter() - started
+
+    def _scan(self, name: str) -> list[Command]:
+        spec = importlib.util.find_spec(name)
+        if spec is None or not spec.origin:
+            raise OSError(f"모듈을 찾을 수 없습니다: {name}")
+
+        tree = ast.parse(Path(spec.origin).read_text(encoding="utf-8"))
+        commands = []
+        for node in tree.body:
+            if not isinstance(node, ast.FunctionDef):
+                continue
+            for decorator in node.decorator_list:
+                if not isinstance(decorator, ast.Call):
+                    continue
+                func = decorator.func
+                func_name = func.id if isinstance(func, ast.Name) else getattr(func, "attr", None)
+                if func_name != "command":
+                    continue
+                args = [ast.literal_eval(arg) for arg in decorator.args]
+                kwargs = {kw.arg: ast.literal_eval(kw.value) for kw in decorator.keywords}
+                commands.append(make_command(None, name, *args, **kwargs))
+        return commands
+
+    def load(self, name: str):
+        """모듈을 불러오고 import 시간을 기록합니다."""
+        with self._load_lock:
+            if name in sys.modules and name not in self.pending:
+                return sys.modules[name]
+
+            started = time.perf_counter()
+            module = importlib.import_module(name)
+            self.load_times[name] = time.perf_counter() - started
+            self.pending.discard(name)
+            return module
+
+    def warm_up(self):
+        """아직 불러오지 않은 모듈을 모두 불러옵니다. 백그라운드 스레드에서 실행하세요."""
+        for name in sorted(self.pending):
+            try:
+                self.load(name)
+            except Exception as e:
+                print(f"[CommandRouter] {name} 모듈을 불러오지 못했습니다 ({e})")
+        print(self.timing_report())
+
+    def timing_report(self) -> str:
+        """모듈별 import 시간 보고서. 먼저 불러온 모듈이 같이 불러온 의존성 시간은 그 모듈에 포함됩니다."""
+        lines = [f"[CommandRouter] 명령어 {len(self.commands)}개, 선언 스캔 {self.discover_time * 1000:.1f}ms"]
+        for name, elapsed in sorted(self.load_times.items(), key=lambda x: x[1], reverse=True):
+            lines.append(f"  {name:<28} {elapsed * 1000:8.1f}ms")
+        for name in sorted(self.pending):
+            lines.append(f"  {name:<28} {'(대기)':>8}")
+        return "\n".join(lines)
+
+    def add_guard(self, guard: t.Callable):
+        """guard(chat)가 False를 반환하면 핸들러를 실행하지 않습니다."""
+        self.guards.append(guard)
+
+    def resolve(self, command: str) -> Command | None:
+        """명령어 문자열로 핸들러를 찾습니다. 접두사가 없으면 바로 None."""
+        if not command or not command.startswith(self.prefix):
+            return None
+        return self.commands.get(command)
+
+    def match(self, chat) -> Command | None:
+        """명령어를 찾고 guard를 통과한 경우에만 Command를 반환합니다."""
+        cmd = self.resolve(chat.message.command)
+        if cmd is None:
+            return None
+
+        if cmd.guarded:
+            for guard in self.guards:
+                if not guard(chat):
+                    return None
+
+        return cmd
+
+    def dispatch(self, chat) -> bool:
+        """
+        메시지를 현재 스레드에서 바로 핸들러로 전달합니다.
+
+        Returns:
+            bool: 명령어로 처리되었는지 여부
+        """
+        cmd = self.match(chat)
+        if cmd is None:
+            return False
+
+        self.run(cmd, chat)
+        return True
+
+    def dedup_key(self, cmd: Command, chat):
+        """대기열에서 중복 요청을 합칠 때 쓰는 키"""
+        if cmd.shared:
+            return chat.message.msg
+        return (chat.sender.id, chat.message.msg)
+
+    def run(self, cmd: Command, chat):
+        if cmd.handler is None:
+            # 첫 호출이면 모듈을 불러와서 실제 핸들러로 교체
+            self.load(cmd.module)
+            cmd = self.commands[cmd.name]
+            if cmd.handler is None:
+                raise RuntimeError(f"{cmd.module} 모듈에 {cmd.name} 명령어가 없습니다")
+
+        kwargs = {key: self.context[key] for key in cmd.inject}
+        return cmd.handler(chat, **kwargs)
+
+    def table(self) -> dict[str, Command]:
+        """등록된 명령어 테이블 (별칭 포함) 사본"""
+        return dict(self.commands)
+
+
+router = CommandRouter()
+command = router.command
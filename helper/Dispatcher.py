@@ -0,0 +1,151 @@
+"""
+명령어 실행 워커 풀 모듈
+
+명령어를 비용 등급(fast, network, cpu, eval)별로 분리된 풀에서 실행해서
+느린 명령어가 가벼운 명령어를 막지 않도록 합니다.
+각 풀의 대기열은 방별로 나뉘어 라운드 로빈으로 처리됩니다.
+"""
+import os
+import sys
+import threading
+import traceback
+import typing as t
+
+from iris import ChatContext
+from iris.decorators import *
+from helper.CommandRouter import command
+from helper.Scheduler import FairQueue, RoomStats, DROPPED
+
+
+class WorkerPool:
+    """고정된 수의 워커 스레드와 방별 공정 대기열"""
+
+    def __init__(self, name: str, workers: int, max_pending: int, room_depth: int = 8, weights: dict | None = None):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue = FairQueue(room_depth, max_pending, weights)
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.wait_total = 0.0
+        self._lock = threading.Lock()
+
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True).start()
+
+    @classmethod
+    def from_env(cls, name: str, workers: int, max_pending: int, weights: dict | None = None):
+        """
+        POOL_<NAME>_WORKERS, POOL_<NAME>_PENDING 환경 변수로 기본값을 덮어씁니다.
+        방별 대기열 길이는 ROOM_QUEUE_DEPTH (기본 8) 입니다.
+        """
+        prefix = f"POOL_{name.upper()}"
+        return cls(
+            name,
+            int(os.getenv(f"{prefix}_WORKERS") or workers),
+            int(os.getenv(f"{prefix}_PENDING") or max_pending),
+            int(os.getenv("ROOM_QUEUE_DEPTH") or 8),
+            weights,
+        )
+
+    def submit(self, room, dedup, func: t.Callable, *args, **kwargs) -> str:
+        """
+        작업을 방 대기열에 넣습니다.
+
+        Args:
+            room: 공정 스케줄링 단위 (chat.room.id)
+            dedup: 같은 방에 같은 키의 작업이 대기 중이면 합칩니다. None이면 합치지 않음
+
+        Returns:
+            str: helper.Scheduler의 QUEUED, COALESCED, DROPPED 중 하나
+        """
+        result = self.queue.put(room, (func, args, kwargs), dedup)
+        if result == DROPPED:
+            with self._lock:
+                self.rejected += 1
+        return result
+
+    def _worker(self):
+        while True:
+            (func, args, kwargs), wait = self.queue.get()
+            with self._lock:
+                self.active += 1
+                self.wait_total += wait
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"[{self.name}] 작업 중 오류가 발생했습니다 ({e})")
+                traceback.print_exc()
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+                sys.stdout.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self.queue.qsize(),
+                "active": self.active,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "avg_wait": self.wait_total / self.completed if self.completed else 0.0,
+            }
+
+
+class Dispatcher:
+    """비용 등급 -> 워커 풀"""
+
+    def __init__(self, pools: list[WorkerPool], default: str = "fast"):
+        self.pools = {pool.name: pool for pool in pools}
+        self.default = default
+
+    def submit(self, cost: str, room, dedup, func: t.Callable, *args, **kwargs) -> str:
+        pool = self.pools.get(cost) or self.pools[self.default]
+        return pool.submit(room, dedup, func, *args, **kwargs)
+
+    def stats(self) -> dict:
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def room_stats(self) -> dict[t.Any, RoomStats]:
+        """모든 풀의 방별 통계를 합칩니다. 대기 시간 최댓값은 풀 중 최댓값입니다."""
+        merged: dict[t.Any, RoomStats] = {}
+        for pool in self.pools.values():
+            for room, stats in pool.queue.room_stats().items():
+                total = merged.setdefault(room, RoomStats())
+                total.depth += stats.depth
+                total.queued += stats.queued
+                total.served += stats.served
+                total.coalesced += stats.coalesced
+                total.dropped += stats.dropped
+                total.wait_total += stats.wait_total
+                total.wait_max = max(total.wait_max, stats.wait_max)
+        return merged
+
+
+@command("!대기열", inject=("dispatcher",))
+@is_admin
+def queue_status_command(chat: ChatContext, dispatcher: Dispatcher):
+    """!대기열 명령어 - 풀별, 방별 대기열 상태를 보여줍니다."""
+    lines = ["워커 풀"]
+    for name, stats in dispatcher.stats().items():
+        lines.append(
+            f"{name} : 실행 {stats['active']}/{stats['workers']} / 대기 {stats['pending']} / "
+            f"거절 {stats['rejected']} / 평균대기 {stats['avg_wait']:.2f}s"
+        )
+
+    lines.append("\n방별 대기열" + "\u200b" * 500)
+    room_stats = sorted(dispatcher.room_stats().items(), key=lambda x: x[1].queued, reverse=True)
+    for room, stats in room_stats:
+        lines.append(
+            f"{room}\n대기 {stats.depth} / 처리 {stats.served} / 합침 {stats.coalesced} / 버림 {stats.dropped}\n"
+            f"평균대기 {stats.avg_wait:.2f}s / 최대대기 {stats.wait_max:.2f}s"
+        )
+
+    chat.reply("\n".join(lines))
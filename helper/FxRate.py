@@ -0,0 +1,114 @@
+"""
+USD/KRW 환율 캐시 모듈
+
+환율을 백그라운드에서 주기적으로 받아 두고, 명령어는 메모리의 값만 읽습니다.
+네이버 환율 계산기를 먼저 쓰고, 실패하면 다음 출처로 넘어갑니다.
+"""
+from dataclasses import dataclass
+import datetime
+import os
+import threading
+import time
+import typing as t
+
+import pytz
+
+from helper.HttpClient import http
+
+FX_REFRESH = int(os.getenv("FX_REFRESH") or 300)
+
+NAVER_URL = "https://m.search.naver.com/p/csearch/content/qapirender.nhn?key=calculator&pkid=141&q=%ED%99%98%EC%9C%A8&where=m&u1=keb&u6=standardUnit&u7=0&u3=USD&u4=KRW&u8=down&u2=1"
+ER_API_URL = "https://open.er-api.com/v6/latest/USD"
+
+
+@dataclass(frozen=True)
+class FxRate:
+    """
+    Args:
+        value: 1달러당 원
+        updated_at: 받은 시각 (unix 시간)
+        source: 출처 이름
+    """
+    value: float
+    updated_at: float
+    source: str
+
+    @property
+    def age(self) -> float:
+        return max(time.time() - self.updated_at, 0.0)
+
+    @property
+    def time_string(self) -> str:
+        return datetime.datetime.fromtimestamp(self.updated_at, pytz.timezone('Asia/Seoul')).strftime("%H:%M")
+
+
+def fetch_naver() -> float:
+    return float(http.get(NAVER_URL).json()["country"][1]["value"].replace(",", ""))
+
+
+def fetch_er_api() -> float:
+    data = http.get(ER_API_URL).json()
+    if data.get("result") != "success":
+        raise ValueError(f"응답 result가 {data.get('result')} 입니다")
+    return float(data["rates"]["KRW"])
+
+
+class FxService:
+    """
+    Args:
+        sources: (이름, 환율 함수) 목록. 앞에서부터 시도합니다.
+        interval: 갱신 주기(초)
+    """
+
+    def __init__(self, sources: list[tuple[str, t.Callable[[], float]]], interval: float = FX_REFRESH):
+        self.sources = sources
+        self.interval = interval
+        self.rate: FxRate | None = None
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._refresher: threading.Thread | None = None
+
+    def get(self) -> FxRate:
+        """
+        캐시된 환율. 처음 한 번만 직접 받아오고 그 뒤로는 백그라운드에서 갱신합니다.
+
+        Raises:
+            LookupError: 한 번도 환율을 받지 못했으면
+        """
+        if self._refresher is None:
+            with self._lock:
+                if self._refresher is None:
+                    self.refresh()
+                    self._refresher = threading.Thread(target=self._refresh_loop, name="fx-rate", daemon=True)
+                    self._refresher.start()
+        if self.rate is None:
+            self.refresh()
+        if self.rate is None:
+            raise LookupError("환율을 가져오지 못했습니다")
+        return self.rate
+
+    @property
+    def stale(self) -> bool:
+        """갱신이 두 번 이상 밀렸으면 True"""
+        return self.rate is None or self.rate.age > self.interval * 2
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.interval)
+            self.refresh()
+
+    def refresh(self) -> FxRate | None:
+        """출처를 차례로 시도합니다. 모두 실패하면 이전 값을 유지합니다."""
+        for name, fetch in self.sources:
+            try:
+                value = fetch()
+            except Exception as e:
+                self.failures += 1
+                print(f"[FxRate] {name} 환율을 가져오지 못했습니다: {e}")
+                continue
+            self.rate = FxRate(value, time.time(), name)
+            return self.rate
+        return None
+
+
+fx_rate = FxService([("네이버", fetch_naver), ("ExchangeRate-API", fetch_er_api)])
@@ -0,0 +1,155 @@
+"""
+공유 HTTP 클라이언트 모듈
+
+모든 bots 모듈이 하나의 requests.Session을 같이 써서 호스트별 연결을 재사용합니다.
+기본 타임아웃, gzip, 호스트별 동시 요청 수 제한과 호스트별 지표를 제공합니다.
+"""
+from dataclasses import dataclass
+from http import cookiejar
+from urllib.parse import urlsplit
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# (연결, 읽기) 타임아웃 초
+DEFAULT_TIMEOUT = (3.05, float(os.getenv("HTTP_TIMEOUT") or 10))
+HOST_CONCURRENCY = int(os.getenv("HTTP_HOST_CONCURRENCY") or 8)
+
+
+class _NoCookies(cookiejar.CookiePolicy):
+    """모듈 단위 requests.get처럼 요청 사이에 쿠키를 남기지 않습니다."""
+    return_ok = set_ok = domain_return_ok = path_return_ok = lambda self, *args, **kwargs: False
+    netscape = True
+    rfc2965 = hide_cookie2 = False
+
+
+@dataclass
+class HostMetrics:
+    """호스트별 요청 지표"""
+    requests: int = 0
+    errors: int = 0
+    bytes: int = 0
+    time_total: float = 0.0
+    wait_total: float = 0.0
+    connections: int = 0
+
+    @property
+    def reused(self) -> int:
+        """새 연결 없이 처리된 요청 수"""
+        return max(self.requests - self.connections, 0)
+
+    @property
+    def avg_time(self) -> float:
+        return self.time_total / self.requests if self.requests else 0.0
+
+    @property
+    def avg_bytes(self) -> float:
+        """요청 하나당 받은 바이트"""
+        return self.bytes / self.requests if self.requests else 0.0
+
+
+class HttpClient:
+    """
+    연결 풀을 공유하는 HTTP 클라이언트
+
+    Args:
+        timeout: 호출마다 timeout을 주지 않으면 쓰는 기본값
+        host_limit: 호스트 하나에 동시에 보낼 수 있는 요청 수
+        host_limits: 호스트별 동시 요청 수 예외 (예: {"api.upbit.com": 4})
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, host_limit: int = HOST_CONCURRENCY, host_limits: dict | None = None):
+        self.timeout = timeout
+        self.host_limit = host_limit
+        self.host_limits = host_limits or {}
+
+        self.adapter = HTTPAdapter(pool_connections=32, pool_maxsize=max(host_limit, *self.host_limits.values(), 1))
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        self.session.cookies.set_policy(_NoCookies())
+
+        self._metrics: dict[str, HostMetrics] = {}
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, host: str):
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                limit = self.host_limits.get(host, self.host_limit)
+                semaphore = self._semaphores[host] = threading.BoundedSemaphore(limit)
+                self._metrics[host] = HostMetrics()
+            return semaphore, self._metrics[host]
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).hostname or ""
+        semaphore, metrics = self._host_state(host)
+
+        queued_at = time.perf_counter()
+        with semaphore:
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException:
+                with self._lock:
+                    metrics.requests += 1
+                    metrics.errors += 1
+                    metrics.wait_total += started - queued_at
+                    metrics.time_total += time.perf_counter() - started
+                raise
+
+        with self._lock:
+            metrics.requests += 1
+            metrics.wait_total += started - queued_at
+            metrics.time_total += time.perf_counter() - started
+            if not kwargs.get("stream"):
+                metrics.bytes += len(response.content)
+            if response.status_code >= 400:
+                metrics.errors += 1
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def metrics(self) -> dict[str, HostMetrics]:
+        """호스트별 지표 사본. connections는 urllib3 연결 풀이 새로 만든 연결 수입니다."""
+        connections: dict[str, int] = {}
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections[key.key_host] = connections.get(key.key_host, 0) + pool.num_connections
+
+        with self._lock:
+            result = {}
+            for host, metrics in self._metrics.items():
+                result[host] = HostMetrics(**vars(metrics))
+                result[host].connections = connections.get(host, 0)
+            return result
+
+    def report(self) -> str:
+        lines = ["[HttpClient] 호스트별 요청 지표"]
+        for host, m in sorted(self.metrics().items(), key=lambda x: x[1].requests, reverse=True):
+            lines.append(
+                f"  {host}: 요청 {m.requests} (재사용 {m.reused}, 새 연결 {m.connections}) / 오류 {m.errors} / "
+                f"평균 {m.avg_time * 1000:.0f}ms / {m.bytes:,}B (요청당 {m.avg_bytes:,.0f}B)"
+            )
+        return "\n".join(lines)
+
+
+http = HttpClient()
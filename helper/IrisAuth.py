@@ -0,0 +1,153 @@
+"""
+Iris AOT 인증 정보 공유 모듈
+
+Iris /aot 에서 받은 토큰을 메모리에 TTL 동안 보관하고,
+동시에 갱신이 필요하면 요청 하나만 보내서 결과를 나눠 씁니다.
+"""
+import os
+import threading
+import time
+import typing as t
+
+import requests
+
+from helper.HttpClient import http
+
+AOT_TTL = int(os.getenv("IRIS_AOT_TTL") or 600)
+REFRESH_TIMEOUT = 10
+
+
+def normalize_endpoint(iris_endpoint: str) -> str:
+    endpoint = iris_endpoint.rstrip("/")
+    if "://" not in endpoint:
+        endpoint = "http://" + endpoint
+    return endpoint
+
+
+def is_unauthorized(response) -> bool:
+    """HTTP 401 이거나 응답 본문의 status가 -401 이면 True"""
+    if response.status_code == 401:
+        return True
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and body.get("status") == -401
+
+
+class AuthProvider:
+    """Iris 하나에 대한 AOT 인증 헤더 값 ("access_token-d_id") 캐시"""
+
+    def __init__(self, iris_endpoint: str, ttl: int = AOT_TTL):
+        self.iris_endpoint = normalize_endpoint(iris_endpoint)
+        self.ttl = ttl
+        self.refreshes = 0
+        self._auth = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._inflight: threading.Event | None = None
+
+    def get(self) -> str | None:
+        """캐시된 인증 값을 반환합니다. 만료되었으면 갱신합니다."""
+        auth = self._auth
+        if auth and time.monotonic() < self._expires_at:
+            return auth
+        return self.refresh()
+
+    def refresh(self) -> str | None:
+        """
+        토큰을 갱신합니다. 이미 다른 스레드가 갱신 중이면 그 결과를 기다립니다.
+        """
+        with self._lock:
+            inflight = self._inflight
+            if inflight is None:
+                inflight = self._inflight = threading.Event()
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            inflight.wait(REFRESH_TIMEOUT)
+            return self._auth
+
+        try:
+            auth = self._fetch()
+            with self._lock:
+                self._auth = auth
+                self._expires_at = time.monotonic() + self.ttl if auth else 0.0
+                self.refreshes += 1
+            return auth
+        finally:
+            with self._lock:
+                self._inflight = None
+            inflight.set()
+
+    def invalidate(self, auth: str | None = None):
+        """
+        캐시를 비웁니다. auth를 주면 그 값이 아직 캐시에 있을 때만 비웁니다.
+        (다른 스레드가 이미 새 토큰으로 갱신한 경우 다시 갱신하지 않도록)
+        """
+        with self._lock:
+            if auth is None or auth == self._auth:
+                self._auth = None
+                self._expires_at = 0.0
+
+    def request(self, send: t.Callable[[str], requests.Response]) -> requests.Response | None:
+        """
+        send(auth)로 요청을 보내고, 인증 오류면 토큰을 갱신해서 한 번만 다시 보냅니다.
+
+        Returns:
+            Response 또는 인증 정보를 가져오지 못하면 None
+        """
+        auth = self.get()
+        if not auth:
+            return None
+
+        response = send(auth)
+        if not is_unauthorized(response):
+            return response
+
+        print("[IrisAuth] 인증 오류 응답을 받아 토큰을 갱신합니다")
+        self.invalidate(auth)
+        auth = self.get()
+        if not auth:
+            return response
+        return send(auth)
+
+    def _fetch(self) -> str | None:
+        try:
+            response = http.get(f"{self.iris_endpoint}/aot", timeout=REFRESH_TIMEOUT)
+            if response.status_code != 200:
+                print(f"[IrisAuth] AOT 요청 실패 - Status: {response.status_code}")
+                return None
+
+            data = response.json()
+            if not data.get("success"):
+                print("[IrisAuth] AOT 응답이 success가 아닙니다")
+                return None
+
+            aot = data.get("aot", {})
+            access_token = aot.get("access_token")
+            device_uuid = aot.get("d_id")
+            if not access_token or not device_uuid:
+                print("[IrisAuth] access_token 또는 d_id가 없습니다")
+                return None
+
+            return f"{access_token}-{device_uuid}"
+        except Exception as e:
+            print(f"[IrisAuth] AOT 정보를 가져오지 못했습니다: {e}")
+            return None
+
+
+_providers: dict[str, AuthProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(iris_endpoint: str) -> AuthProvider:
+    """Iris 주소별로 공유되는 AuthProvider"""
+    endpoint = normalize_endpoint(iris_endpoint)
+    with _providers_lock:
+        provider = _providers.get(endpoint)
+        if provider is None:
+            provider = _providers[endpoint] = AuthProvider(endpoint)
+        return provider
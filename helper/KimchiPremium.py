@@ -0,0 +1,175 @@
+"""
+김치 프리미엄 기록 모듈
+
+일정 간격으로 BTC 원화가, BTC 달러가, 환율, 김프를 기록합니다.
+기록은 고정 크기 링 버퍼(.npy 메모리 맵)에 한 줄씩 덮어쓰므로 파일 크기가 늘지 않고,
+차트는 이 버퍼만 읽어서 외부 요청 없이 그립니다.
+"""
+import datetime
+import io
+import os
+import threading
+import time
+
+import numpy as np
+import pytz
+
+from helper.CoinMarket import binance_tickers, upbit_tickers
+from helper.FxRate import fx_rate
+
+SAMPLE_INTERVAL = int(os.getenv("KIMP_SAMPLE_INTERVAL") or 60)
+SAMPLE_DAYS = int(os.getenv("KIMP_SAMPLE_DAYS") or 7)
+SAMPLE_PATH = "kimp_samples.npy"
+
+SAMPLE_DTYPE = np.dtype([
+    ("ts", "f8"),
+    ("btc_krw", "f8"),
+    ("btc_usdt", "f8"),
+    ("usdkrw", "f8"),
+    ("premium", "f8"),
+])
+
+FONT_PATH = "res/GmarketSansMedium.otf"
+KST = pytz.timezone('Asia/Seoul')
+
+
+class SampleRing:
+    """
+    .npy 파일을 메모리 맵으로 연 고정 크기 링 버퍼
+
+    비어 있는 칸은 ts가 0이고, 다음에 쓸 위치는 가장 최근 ts 다음 칸이라 따로 저장하지 않습니다.
+
+    Args:
+        path: 파일 경로
+        capacity: 저장할 최대 샘플 수
+    """
+
+    def __init__(self, path: str, capacity: int):
+        self.path = path
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._data = self._open()
+        filled = self._data["ts"] > 0
+        self.count = int(filled.sum())
+        self.head = (int(np.argmax(self._data["ts"])) + 1) % capacity if self.count else 0
+
+    def _open(self) -> np.memmap:
+        if os.path.exists(self.path):
+            try:
+                data = np.lib.format.open_memmap(self.path, mode="r+")
+                if data.dtype == SAMPLE_DTYPE and data.shape == (self.capacity,):
+                    return data
+                print(f"[KimchiPremium] {self.path} 형식이 달라 새로 만듭니다")
+            except (ValueError, OSError) as e:
+                print(f"[KimchiPremium] {self.path} 을 열 수 없어 새로 만듭니다 ({e})")
+        return np.lib.format.open_memmap(self.path, mode="w+", dtype=SAMPLE_DTYPE, shape=(self.capacity,))
+
+    def append(self, ts: float, btc_krw: float, btc_usdt: float, usdkrw: float, premium: float):
+        with self._lock:
+            self._data[self.head] = (ts, btc_krw, btc_usdt, usdkrw, premium)
+            self._data.flush()
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def window(self, since: float) -> np.ndarray:
+        """since(unix 시간) 이후 샘플을 오래된 순서로 복사해서 돌려줍니다."""
+        with self._lock:
+            if self.count < self.capacity:
+                ordered = np.array(self._data[:self.head])
+            else:
+                ordered = np.concatenate((self._data[self.head:], self._data[:self.head]))
+        return ordered[ordered["ts"] >= since]
+
+
+class KimchiSampler:
+    def __init__(self, path: str = SAMPLE_PATH, interval: int = SAMPLE_INTERVAL, days: int = SAMPLE_DAYS):
+        self.path = path
+        self.interval = interval
+        self.capacity = max(days * 86400 // interval, 1)
+        self.ring: SampleRing | None = None
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def _ensure_ring(self) -> SampleRing:
+        with self._lock:
+            if self.ring is None:
+                self.ring = SampleRing(self.path, self.capacity)
+            return self.ring
+
+    def start(self):
+        self._ensure_ring()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="kimp-sampler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"[KimchiPremium] 샘플을 기록하지 못했습니다: {e}")
+            time.sleep(self.interval - time.time() % self.interval)
+
+    def sample(self):
+        btc_krw = upbit_tickers.get("KRW-BTC")
+        btc_usdt = binance_tickers.get("BTCUSDT")
+        usdkrw = fx_rate.get().value
+        if btc_krw is None or btc_usdt is None:
+            raise LookupError("BTC 시세가 없습니다")
+        usd_to_krw = btc_usdt.price * usdkrw
+        premium = (btc_krw.price - usd_to_krw) / usd_to_krw * 100
+        self._ensure_ring().append(time.time(), btc_krw.price, btc_usdt.price, usdkrw, premium)
+
+    def window(self, seconds: float) -> np.ndarray:
+        return self._ensure_ring().window(time.time() - seconds)
+
+
+def render_chart(samples: np.ndarray, title: str, width: int = 900, height: int = 450) -> bytes:
+    """김프 샘플을 선 그래프 PNG로 그립니다."""
+    # 샘플러는 numpy만 쓰므로 PIL은 차트를 그릴 때 불러옵니다
+    from PIL import Image, ImageDraw, ImageFont
+
+    left, right, top, bottom = 70, 20, 60, 40
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    title_font = ImageFont.FreeTypeFont(FONT_PATH, 22)
+    font = ImageFont.FreeTypeFont(FONT_PATH, 14)
+
+    premium = samples["premium"]
+    ts = samples["ts"]
+    low, high = float(premium.min()), float(premium.max())
+    if high - low < 0.1:
+        low, high = low - 0.05, high + 0.05
+    start, end = float(ts[0]), float(ts[-1])
+    span = max(end - start, 1.0)
+
+    draw.text((left, 15), f"{title}   현재 {premium[-1]:.2f}%  최고 {premium.max():.2f}%  최저 {premium.min():.2f}%", fill="black", font=title_font)
+
+    plot_w, plot_h = width - left - right, height - top - bottom
+    for i in range(5):
+        value = low + (high - low) * i / 4
+        y = top + plot_h - plot_h * i / 4
+        draw.line([(left, y), (width - right, y)], fill=(225, 225, 225))
+        draw.text((5, y - 8), f"{value:.2f}%", fill=(90, 90, 90), font=font)
+    if low < 0 < high:
+        y = top + plot_h - plot_h * (0 - low) / (high - low)
+        draw.line([(left, y), (width - right, y)], fill=(160, 160, 160))
+
+    # 픽셀보다 샘플이 많으면 건너뛰며 그립니다
+    step = max(len(samples) // plot_w, 1)
+    xs = left + (ts[::step] - start) / span * plot_w
+    ys = top + plot_h - (premium[::step] - low) / (high - low) * plot_h
+    points = list(zip(xs.tolist(), ys.tolist()))
+    if len(points) > 1:
+        draw.line(points, fill=(220, 50, 50), width=2)
+
+    for x_ts, anchor_x in ((start, left), (end, width - right - 90)):
+        label = datetime.datetime.fromtimestamp(x_ts, KST).strftime("%m/%d %H:%M")
+        draw.text((anchor_x, height - bottom + 10), label, fill=(90, 90, 90), font=font)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+kimchi_sampler = KimchiSampler()
@@ -0,0 +1,202 @@
+"""
+닉네임 변경 기록 저장 모듈
+
+닉네임 기록을 iris.db의 nickname_history 테이블에 한 줄씩 추가합니다.
+변경 하나는 INSERT 하나이고, 조회는 user_id 인덱스로 한 사람 것만 읽습니다.
+nickname 인덱스로 예전 닉네임에서 user_id를 찾을 수 있습니다.
+"""
+from dataclasses import dataclass
+import datetime
+import sqlite3
+import threading
+import time
+
+import pytz
+
+KST = pytz.timezone('Asia/Seoul')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nickname_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    nickname TEXT NOT NULL,
+    changed_at INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_nickname_history_user ON nickname_history (user_id, changed_at);
+CREATE INDEX IF NOT EXISTS idx_nickname_history_nickname ON nickname_history (nickname);
+"""
+
+
+@dataclass(frozen=True)
+class NicknameEntry:
+    """
+    nickname_history 한 행
+
+    changed_at은 변경을 감지한 unix 시간(초)이고, 처음 본 닉네임이면 None입니다.
+    """
+    user_id: str
+    chat_id: str
+    nickname: str
+    changed_at: int | None
+
+    @property
+    def date(self) -> str:
+        if self.changed_at is None:
+            return ""
+        return datetime.datetime.fromtimestamp(self.changed_at, KST).strftime("%y%m%d %H:%M")
+
+
+class NicknameStore:
+    """
+    Args:
+        filename: SQLite 파일 경로 (기본값은 PyKV와 같은 iris.db)
+    """
+
+    def __init__(self, filename: str = "iris.db"):
+        self.filename = filename
+        self._local = threading.local()
+
+    def _get_db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.filename, check_same_thread=False)
+            db.executescript(SCHEMA)
+            db.commit()
+        return db
+
+    def latest(self, user_id, chat_id=None) -> NicknameEntry | None:
+        """
+        가장 최근에 기록된 닉네임. 오픈채팅은 방마다 프로필이 다를 수 있어서
+        chat_id를 주면 그 방에서 기록된 것만 봅니다.
+        """
+        condition, bind = self._user_condition(user_id, chat_id)
+        row = self._get_db().execute(
+            "SELECT user_id, chat_id, nickname, changed_at FROM nickname_history "
+            f"WHERE {condition} ORDER BY changed_at DESC, id DESC LIMIT 1",
+            bind,
+        ).fetchone()
+        return NicknameEntry(*row) if row else None
+
+    def history(self, user_id, chat_id=None) -> list[NicknameEntry]:
+        """한 사람의 닉네임 기록 (오래된 순). chat_id를 주면 그 방 기록만"""
+        condition, bind = self._user_condition(user_id, chat_id)
+        rows = self._get_db().execute(
+            "SELECT user_id, chat_id, nickname, changed_at FROM nickname_history "
+            f"WHERE {condition} ORDER BY changed_at, id",
+            bind,
+        ).fetchall()
+        return [NicknameEntry(*row) for row in rows]
+
+    @staticmethod
+    def _user_condition(user_id, chat_id) -> tuple[str, tuple]:
+        if chat_id is None:
+            return "user_id = ?", (str(user_id),)
+        return "user_id = ? AND chat_id = ?", (str(user_id), str(chat_id))
+
+    def history_page(self, user_id, page: int = 1, size: int = 10) -> tuple[list[NicknameEntry], int]:
+        """
+        한 사람의 닉네임 기록 한 페이지 (최신 순)
+
+        Returns:
+            (기록 목록, 전체 기록 수)
+        """
+        db = self._get_db()
+        total = db.execute("SELECT count(*) FROM nickname_history WHERE user_id = ?", (str(user_id),)).fetchone()[0]
+        rows = db.execute(
+            "SELECT user_id, chat_id, nickname, changed_at FROM nickname_history "
+            "WHERE user_id = ? ORDER BY changed_at DESC, id DESC LIMIT ? OFFSET ?",
+            (str(user_id), size, (page - 1) * size),
+        ).fetchall()
+        return [NicknameEntry(*row) for row in rows], total
+
+    def find_users(self, nickname: str, page: int = 1, size: int = 10, prefix: bool = False) -> tuple[list[NicknameEntry], int]:
+        """
+        닉네임을 썼던 사람 목록 (마지막으로 쓴 순). prefix=True면 그 글자로 시작하는 닉네임까지 찾습니다.
+
+        Returns:
+            (사람마다 그 닉네임을 쓴 마지막 기록, 전체 사람 수)
+        """
+        if prefix:
+            # LIKE 대신 범위 조건을 써야 nickname 인덱스를 탑니다
+            condition, bind = "nickname >= ? AND nickname < ?", (nickname, nickname + "\U0010ffff")
+        else:
+            condition, bind = "nickname = ?", (nickname,)
+
+        db = self._get_db()
+        total = db.execute(
+            f"SELECT count(DISTINCT user_id) FROM nickname_history WHERE {condition}", bind
+        ).fetchone()[0]
+        rows = db.execute(
+            "SELECT user_id, chat_id, nickname, max(coalesce(changed_at, 0)) AS last_used FROM nickname_history "
+            f"WHERE {condition} GROUP BY user_id ORDER BY last_used DESC, user_id LIMIT ? OFFSET ?",
+            (*bind, size, (page - 1) * size),
+        ).fetchall()
+        return [NicknameEntry(user_id, chat_id, name, last_used or None) for user_id, chat_id, name, last_used in rows], total
+
+    def append(self, user_id, chat_id, nickname: str, changed_at: int | None = None) -> NicknameEntry:
+        """닉네임 기록 한 줄을 추가합니다. changed_at을 주지 않으면 처음 본 닉네임으로 저장합니다."""
+        entry = NicknameEntry(str(user_id), str(chat_id), nickname, changed_at)
+        self.append_many([entry])
+        return entry
+
+    def append_many(self, entries: list[NicknameEntry]):
+        """여러 줄을 한 트랜잭션으로 추가합니다."""
+        if not entries:
+            return
+        db = self._get_db()
+        with db:
+            db.executemany(
+                "INSERT INTO nickname_history (user_id, chat_id, nickname, changed_at) VALUES (?, ?, ?, ?)",
+                [(e.user_id, e.chat_id, e.nickname, e.changed_at) for e in entries],
+            )
+
+    def is_empty(self) -> bool:
+        return self._get_db().execute("SELECT 1 FROM nickname_history LIMIT 1").fetchone() is None
+
+    def migrate_kv(self, kv) -> int:
+        """
+        예전 KV 'user_history' 기록을 테이블로 옮기고 KV 키를 지웁니다.
+        테이블에 이미 기록이 있으면 옮기지 않습니다.
+
+        Returns:
+            옮긴 행 수
+        """
+        legacy = kv.get('user_history')
+        if not legacy:
+            return 0
+        if not self.is_empty():
+            kv.delete('user_history')
+            return 0
+
+        entries = []
+        for user_id, user in legacy.items():
+            for change in user.get("history", []):
+                entries.append(NicknameEntry(
+                    str(user_id),
+                    str(change.get("involved_chat_id", "")),
+                    change.get("nickname", ""),
+                    parse_date(change.get("date", "")),
+                ))
+        self.append_many(entries)
+        kv.delete('user_history')
+        print(f"[NicknameStore] user_history {len(entries)}건을 nickname_history 테이블로 옮겼습니다")
+        return len(entries)
+
+
+def parse_date(date: str) -> int | None:
+    """예전 기록의 "%y%m%d %H:%M" (KST) 문자열을 unix 시간으로 바꿉니다."""
+    if not date:
+        return None
+    try:
+        parsed = datetime.datetime.strptime(date, "%y%m%d %H:%M")
+    except ValueError:
+        return None
+    return int(KST.localize(parsed).timestamp())
+
+
+def now() -> int:
+    return int(time.time())
+
+
+nickname_store = NicknameStore()
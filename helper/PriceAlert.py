@@ -0,0 +1,225 @@
+"""
+코인 가격 알림 모듈
+
+마켓마다 상승/하락 알림 기준가를 정렬된 목록으로 들고 있다가,
+시세가 들어오면 넘어선 구간만 bisect로 잘라서 울립니다.
+울린 알림은 큐에 넣고, 알림 스레드가 저장한 뒤 방별로 모아서 멘션 메세지 하나로 보냅니다.
+알림 목록은 KV 'coin.alerts'에 저장합니다.
+"""
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, asdict
+import os
+import queue
+import re
+import threading
+import typing as t
+
+from iris import PyKV
+
+from helper.CoinMarket import Ticker, TickerCache, upbit_tickers
+
+ALERT_INTERVAL = float(os.getenv("COIN_ALERT_INTERVAL") or 5)
+ALERT_LIMIT = 10
+
+UP = "up"
+DOWN = "down"
+
+PRICE_UNITS = {"억": 100_000_000, "만": 10_000, "": 1}
+PRICE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)?(천|백)?(억|만)?")
+
+
+def parse_price(text: str) -> float | None:
+    """
+    "1억", "1억2천만", "5천만", "천만", "95,000,000" 같은 가격을 숫자로 바꿉니다. 형식이 틀리면 None
+    단위 앞에 숫자가 없으면 1로 봅니다. ("천만" = 1천만, "억" = 1억)
+    """
+    text = text.replace(",", "").replace(" ", "").removesuffix("원")
+    if not text:
+        return None
+    value = 0.0
+    position = 0
+    for match in PRICE_PATTERN.finditer(text):
+        if not match.group(0):
+            continue
+        if match.start() != position:
+            return None
+        number = float(match.group(1) or 1)
+        if match.group(2):
+            number *= 1000 if match.group(2) == "천" else 100
+        value += number * PRICE_UNITS[match.group(3) or ""]
+        position = match.end()
+    if position != len(text) or value <= 0:
+        return None
+    return value
+
+
+def format_price(price: float) -> str:
+    if price >= 100_000_000:
+        return f"{price / 100_000_000:,.4g}억원"
+    return f"{price:,.10g}원"
+
+
+@dataclass
+class Alert:
+    id: int
+    user_id: int
+    name: str
+    room_id: int
+    market: str
+    threshold: float
+    direction: str
+
+    def describe(self) -> str:
+        verb = "이상" if self.direction == UP else "이하"
+        return f"{self.market[4:]} {format_price(self.threshold)} {verb}"
+
+
+class PriceAlertEngine:
+    """
+    Args:
+        tickers: 시세 캐시. 새 시세가 들어올 때마다 알림을 확인합니다.
+        send: (iris 주소, 방 ID, [(user_id, 이름)], 메세지) 로 멘션을 보내는 함수
+        interval: 알림이 걸린 마켓 시세를 직접 요청하는 주기(초). 스트림이 켜져 있으면 캐시에서 바로 읽습니다.
+    """
+
+    def __init__(self, tickers: TickerCache = upbit_tickers, send: t.Callable | None = None, interval: float = ALERT_INTERVAL):
+        self.tickers = tickers
+        self.send = send
+        self.interval = interval
+        self.iris_endpoint: str | None = None
+        self.alerts: dict[int, Alert] = {}
+        self._up: dict[str, list[tuple[float, int]]] = {}
+        self._down: dict[str, list[tuple[float, int]]] = {}
+        self._next_id = 1
+        self._lock = threading.RLock()
+        self._fired: queue.Queue[tuple[Alert, float]] = queue.Queue()
+        self._started = False
+
+    def start(self, iris_endpoint: str):
+        """저장된 알림을 불러오고 시세 감시를 시작합니다. 여러 번 불러도 한 번만 시작합니다."""
+        with self._lock:
+            self.iris_endpoint = self.iris_endpoint or iris_endpoint
+            if self._started:
+                return
+            self._started = True
+            for item in PyKV().get('coin.alerts') or []:
+                self._index(Alert(**item))
+            self._next_id = max(self.alerts, default=0) + 1
+        if self.send is None:
+            from bots.mentions import send_mentions
+            self.send = send_mentions
+        self.tickers.listeners.append(self.on_tickers)
+        threading.Thread(target=self._poll_loop, name="price-alert", daemon=True).start()
+        threading.Thread(target=self._send_loop, name="price-alert-send", daemon=True).start()
+
+    def _save(self):
+        PyKV().put('coin.alerts', [asdict(alert) for alert in self.alerts.values()])
+
+    def _index(self, alert: Alert):
+        self.alerts[alert.id] = alert
+        book = self._up if alert.direction == UP else self._down
+        insort(book.setdefault(alert.market, []), (alert.threshold, alert.id))
+
+    def _unindex(self, alert: Alert):
+        book = self._up if alert.direction == UP else self._down
+        entries = book.get(alert.market, [])
+        entry = (alert.threshold, alert.id)
+        index = bisect_left(entries, entry)
+        if index < len(entries) and entries[index] == entry:
+            del entries[index]
+        if not entries:
+            book.pop(alert.market, None)
+        self.alerts.pop(alert.id, None)
+
+    def add(self, user_id, name: str, room_id, market: str, threshold: float, current_price: float) -> Alert:
+        """현재가보다 높은 기준가는 상승 알림, 낮거나 같으면 하락 알림으로 등록합니다."""
+        with self._lock:
+            alert = Alert(self._next_id, user_id, name, room_id, market, threshold, UP if threshold > current_price else DOWN)
+            self._next_id += 1
+            self._index(alert)
+            self._save()
+            return alert
+
+    def remove(self, user_id, alert_id: int) -> Alert | None:
+        with self._lock:
+            alert = self.alerts.get(alert_id)
+            if alert is None or alert.user_id != user_id:
+                return None
+            self._unindex(alert)
+            self._save()
+            return alert
+
+    def user_alerts(self, user_id) -> list[Alert]:
+        with self._lock:
+            return [alert for alert in self.alerts.values() if alert.user_id == user_id]
+
+    def markets(self) -> list[str]:
+        with self._lock:
+            return list(set(self._up) | set(self._down))
+
+    def check(self, market: str, price: float) -> list[Alert]:
+        """price로 넘어선 알림을 목록에서 빼고 돌려줍니다."""
+        with self._lock:
+            fired_ids = []
+            up = self._up.get(market)
+            if up:
+                crossed = bisect_right(up, (price, float("inf")))
+                fired_ids += [alert_id for _, alert_id in up[:crossed]]
+            down = self._down.get(market)
+            if down:
+                crossed = bisect_left(down, (price, -1))
+                fired_ids += [alert_id for _, alert_id in down[crossed:]]
+            fired = [self.alerts[alert_id] for alert_id in fired_ids]
+            for alert in fired:
+                self._unindex(alert)
+            return fired
+
+    def on_tickers(self, tickers: list[Ticker]):
+        """
+        시세 캐시 리스너. 시세를 가져온 스레드(스트림, 요청 스레드)에서 불리므로
+        넘어선 알림만 골라서 큐에 넣고, 저장과 전송은 알림 스레드에 맡깁니다.
+        """
+        for ticker in tickers:
+            if ticker.key in self._up or ticker.key in self._down:
+                for alert in self.check(ticker.key, ticker.price):
+                    self._fired.put((alert, ticker.price))
+
+    def _send_loop(self):
+        while True:
+            fired = [self._fired.get()]
+            # 같은 시세 묶음에서 울린 알림은 한 번에 저장하고 보냅니다
+            while True:
+                try:
+                    fired.append(self._fired.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._deliver(fired)
+            except Exception as e:
+                print(f"[PriceAlert] 알림을 보내지 못했습니다: {e}")
+
+    def _deliver(self, fired: list[tuple[Alert, float]]):
+        with self._lock:
+            self._save()
+
+        rooms: dict[int, list[tuple[Alert, float]]] = {}
+        for alert, price in fired:
+            rooms.setdefault(alert.room_id, []).append((alert, price))
+        for room_id, room_alerts in rooms.items():
+            users = list(dict.fromkeys((alert.user_id, alert.name) for alert, _ in room_alerts))
+            lines = [f"{alert.describe()} 도달 (현재 {format_price(price)})" for alert, price in room_alerts]
+            self.send(self.iris_endpoint, room_id, users, "\n가격 알림\n" + "\n".join(lines))
+
+    def _poll_loop(self):
+        stop = threading.Event()
+        while not stop.wait(self.interval):
+            markets = self.markets()
+            if not markets:
+                continue
+            try:
+                self.tickers.get_many(markets)
+            except Exception as e:
+                print(f"[PriceAlert] 시세를 가져오지 못했습니다: {e}")
+
+
+alert_engine = PriceAlertEngine()
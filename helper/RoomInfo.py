@@ -0,0 +1,71 @@
+"""
+채팅방 메타데이터 캐시 모듈
+
+chat_rooms 테이블의 link_id, type, moim_meta(공지 post_id)를 방 ID별로 캐시해서
+공지, 리액션 명령어마다 Iris /query를 보내지 않도록 합니다.
+"""
+from dataclasses import dataclass
+import json
+import os
+import typing as t
+
+from helper.Cache import TTLCache
+
+ROOM_META_TTL = int(os.getenv("ROOM_META_TTL") or 300)
+
+room_meta_cache = TTLCache(ttl=ROOM_META_TTL, maxsize=1024)
+
+
+@dataclass(frozen=True)
+class RoomMeta:
+    """chat_rooms 한 행에서 필요한 값"""
+    link_id: str | None
+    type: str | None
+    post_id: str | None
+
+
+def parse_post_id(raw_meta) -> str | None:
+    """moim_meta JSON에서 현재 공지의 post_id를 꺼냅니다."""
+    if not raw_meta:
+        return None
+    moim_meta = json.loads(raw_meta)
+    if isinstance(moim_meta, list) and moim_meta:
+        ct_raw = moim_meta[0].get("ct")
+        if ct_raw:
+            return json.loads(ct_raw).get("id")
+    return None
+
+
+def get_room_meta(room_id, query: t.Callable[[str, list], list[dict]]) -> RoomMeta | None:
+    """
+    방 메타데이터를 캐시에서 가져오고, 없으면 한 번 조회해서 저장합니다.
+
+    Args:
+        room_id: 채팅방 ID
+        query: (sql, bind) -> 행 목록 함수 (예: chat.api.query)
+
+    Returns:
+        RoomMeta 또는 chat_rooms에 방이 없으면 None
+    """
+    def load():
+        result = query("SELECT id, link_id, type, moim_meta FROM chat_rooms WHERE id = ?", [str(room_id)])
+        if not result:
+            return None
+        row = result[0]
+        try:
+            post_id = parse_post_id(row.get("moim_meta"))
+        except (ValueError, AttributeError) as e:
+            print(f"[RoomInfo] moim_meta 파싱 실패 ({room_id}): {e}")
+            post_id = None
+        return RoomMeta(
+            link_id=row.get("link_id") or None,
+            type=row.get("type"),
+            post_id=post_id,
+        )
+
+    return room_meta_cache.get_or_load(str(room_id), load)
+
+
+def invalidate_room(room_id):
+    """공지 등록/수정/삭제 후 호출해서 다음 조회 때 새로 읽게 합니다."""
+    room_meta_cache.invalidate(str(room_id))
@@ -0,0 +1,126 @@
+"""
+방별 공정 스케줄링 대기열 모듈
+
+방(chat.room.id)마다 대기열을 따로 두고 가중치 라운드 로빈으로 꺼내서
+한 방의 명령어 폭주가 다른 방의 응답을 밀어내지 않도록 합니다.
+"""
+from collections import deque
+from dataclasses import dataclass
+import threading
+import time
+import typing as t
+
+QUEUED = "queued"
+COALESCED = "coalesced"
+DROPPED = "dropped"
+
+
+@dataclass
+class RoomStats:
+    """방별 대기열 통계"""
+    depth: int = 0
+    queued: int = 0
+    served: int = 0
+    coalesced: int = 0
+    dropped: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+
+    @property
+    def avg_wait(self) -> float:
+        return self.wait_total / self.served if self.served else 0.0
+
+
+class FairQueue:
+    """
+    방별 대기열을 가중치 라운드 로빈으로 비우는 블로킹 큐
+
+    Args:
+        max_depth: 방 하나에 쌓일 수 있는 최대 작업 수. 넘으면 새 작업을 버립니다.
+        max_total: 전체 대기 작업 수 상한
+        weights: 방 ID -> 한 차례에 연속으로 꺼낼 작업 수 (기본 1)
+    """
+
+    def __init__(self, max_depth: int, max_total: int, weights: dict | None = None):
+        self.max_depth = max_depth
+        self.max_total = max_total
+        self.weights = weights or {}
+        self.rooms: dict[t.Any, deque] = {}
+        self.pending_keys: dict[t.Any, set] = {}
+        self.stats: dict[t.Any, RoomStats] = {}
+        self.ring: deque = deque()
+        self.turn = 0
+        self.total = 0
+        self.cond = threading.Condition()
+
+    def put(self, room, item, dedup=None) -> str:
+        """
+        작업을 방 대기열에 넣습니다.
+
+        Args:
+            dedup: 같은 방에 같은 키의 작업이 이미 대기 중이면 새 작업을 합칩니다
+
+        Returns:
+            str: QUEUED, COALESCED, DROPPED 중 하나
+        """
+        with self.cond:
+            stats = self.stats.setdefault(room, RoomStats())
+            keys = self.pending_keys.setdefault(room, set())
+
+            if dedup is not None and dedup in keys:
+                stats.coalesced += 1
+                return COALESCED
+
+            queue = self.rooms.setdefault(room, deque())
+            if len(queue) >= self.max_depth or self.total >= self.max_total:
+                stats.dropped += 1
+                return DROPPED
+
+            if not queue:
+                self.ring.append(room)
+            queue.append((item, dedup, time.monotonic()))
+            if dedup is not None:
+                keys.add(dedup)
+
+            self.total += 1
+            stats.queued += 1
+            stats.depth = len(queue)
+            self.cond.notify()
+            return QUEUED
+
+    def get(self):
+        """다음 차례 방의 작업을 꺼냅니다. 대기 작업이 없으면 블록됩니다."""
+        with self.cond:
+            while not self.ring:
+                self.cond.wait()
+
+            room = self.ring[0]
+            queue = self.rooms[room]
+            item, dedup, queued_at = queue.popleft()
+            if dedup is not None:
+                self.pending_keys[room].discard(dedup)
+
+            self.total -= 1
+            self.turn += 1
+            if not queue:
+                self.ring.popleft()
+                self.turn = 0
+            elif self.turn >= self.weights.get(room, 1):
+                self.ring.rotate(-1)
+                self.turn = 0
+
+            wait = time.monotonic() - queued_at
+            stats = self.stats[room]
+            stats.depth = len(queue)
+            stats.served += 1
+            stats.wait_total += wait
+            stats.wait_max = max(stats.wait_max, wait)
+            return item, wait
+
+    def qsize(self) -> int:
+        with self.cond:
+            return self.total
+
+    def room_stats(self) -> dict:
+        with self.cond:
+            return {room: RoomStats(**vars(stats)) for room, stats in self.stats.items()}
@@ -0,0 +1,92 @@
+"""
+주식 카드 캐시 모듈
+
+!주식은 차트 PNG(종목별)와 완성된 카드 PNG(종목 + 실시간 시세 해시별) 두 단계로 캐시합니다.
+장중에는 짧게, 장이 끝나면 다음 장 시작까지 캐시해서 장 마감 뒤 같은 요청은 외부 요청도, 다시 그리기도 하지 않습니다.
+장 시간은 시간외 거래를 포함한 평일 08:30~18:00(KST)으로 보고, 공휴일은 장중으로 취급합니다.
+단계별 소요 시간은 stock_timings에 모아서 !주식지표로 봅니다.
+"""
+import datetime
+import hashlib
+import json
+import os
+import threading
+
+import pytz
+
+from helper.Cache import TTLCache
+
+KST = pytz.timezone('Asia/Seoul')
+KRX_OPEN = datetime.time(8, 30)
+KRX_CLOSE = datetime.time(18, 0)
+
+CHART_TTL = int(os.getenv("STOCK_CHART_TTL") or 60)
+QUOTE_TTL = int(os.getenv("STOCK_QUOTE_TTL") or 5)
+CHART_DEADLINE = float(os.getenv("STOCK_CHART_DEADLINE") or 2)
+
+
+def market_open(now: datetime.datetime | None = None) -> bool:
+    now = now or datetime.datetime.now(KST)
+    return now.weekday() < 5 and KRX_OPEN <= now.time() < KRX_CLOSE
+
+
+def seconds_until_open(now: datetime.datetime | None = None) -> float:
+    """다음 장 시작까지 남은 시간(초). 장중이면 0"""
+    now = now or datetime.datetime.now(KST)
+    if market_open(now):
+        return 0.0
+    day = now.date()
+    if now.time() >= KRX_OPEN:
+        day += datetime.timedelta(days=1)
+    while day.weekday() >= 5:
+        day += datetime.timedelta(days=1)
+    opens_at = KST.localize(datetime.datetime.combine(day, KRX_OPEN))
+    return (opens_at - now).total_seconds()
+
+
+def market_ttl(open_ttl: float, now: datetime.datetime | None = None) -> float:
+    """장중이면 open_ttl, 장이 끝났으면 다음 장 시작까지"""
+    return seconds_until_open(now) or open_ttl
+
+
+def card_key(code: str, chart: bytes | None, stock_data: dict) -> tuple[str, str]:
+    """카드 캐시 키. 실시간 시세와 차트가 같으면 같은 카드입니다."""
+    digest = hashlib.sha1(json.dumps(stock_data, sort_keys=True).encode())
+    digest.update(chart or b"")
+    return code, digest.hexdigest()
+
+
+class StageTimings:
+    """!주식 단계별(검색, 차트, 시세, 그리기, 전체) 소요 시간과 차트 없이 보낸 횟수"""
+
+    def __init__(self):
+        self.count: dict[str, int] = {}
+        self.total: dict[str, float] = {}
+        self.max: dict[str, float] = {}
+        self.text_only = 0
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.count[stage] = self.count.get(stage, 0) + 1
+            self.total[stage] = self.total.get(stage, 0.0) + seconds
+            self.max[stage] = max(self.max.get(stage, 0.0), seconds)
+
+    def record_text_only(self):
+        with self._lock:
+            self.text_only += 1
+
+    def report(self) -> list[str]:
+        with self._lock:
+            lines = [
+                f"{stage} : {count}회 / 평균 {self.total[stage] / count * 1000:.0f}ms / 최대 {self.max[stage] * 1000:.0f}ms"
+                for stage, count in self.count.items()
+            ]
+            lines.append(f"차트 없이 보냄 : {self.text_only}회")
+            return lines
+
+
+stock_timings = StageTimings()
+chart_cache = TTLCache(CHART_TTL, maxsize=64)
+quote_cache = TTLCache(QUOTE_TTL, maxsize=256)
+card_cache = TTLCache(CHART_TTL, maxsize=64)
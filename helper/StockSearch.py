@@ -0,0 +1,236 @@
+"""
+주식 종목 검색 캐시 모듈
+
+!주식 검색어를 종목 코드/이름/시장(typeCode)으로 바꿉니다.
+찾는 순서는 별칭 -> 메모리 LRU -> 코스피/코스닥 종목 목록(이름 일치, 코드, 유일한 접두어)
+-> iris.db의 stock_search 캐시 -> 네이버 자동완성 입니다.
+종목 목록은 stock_listing 테이블에 저장해 두고 하루에 한 번 백그라운드에서 새로 받습니다.
+"""
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+
+from helper.HttpClient import http
+
+AUTOCOMPLETE_URL = "https://ac.stock.naver.com/ac?q={query}&target=stock%2Cipo%2Cindex%2Cmarketindicator"
+LISTING_URL = "https://m.stock.naver.com/api/stocks/marketValue/{market}?page={page}&pageSize=100"
+LISTING_MARKETS = ("KOSPI", "KOSDAQ")
+
+SEARCH_TTL = int(os.getenv("STOCK_SEARCH_TTL") or 7 * 86400)
+LISTING_TTL = int(os.getenv("STOCK_LISTING_TTL") or 86400)
+LRU_SIZE = 256
+
+# 자주 쓰는 줄임말 -> 종목 이름
+ALIASES = {
+    "삼전": "삼성전자",
+    "삼전우": "삼성전자우",
+    "하닉": "SK하이닉스",
+    "하이닉스": "SK하이닉스",
+    "엘지전자": "LG전자",
+    "엘지에너지솔루션": "LG에너지솔루션",
+    "엘엔솔": "LG에너지솔루션",
+    "현차": "현대차",
+    "현대자동차": "현대차",
+    "삼바": "삼성바이오로직스",
+    "셀트": "셀트리온",
+    "카뱅": "카카오뱅크",
+    "카페": "카카오페이",
+    "포스코": "POSCO홀딩스",
+    "한화에어로": "한화에어로스페이스",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock_search (
+    query TEXT PRIMARY KEY,
+    code TEXT NOT NULL,
+    name TEXT NOT NULL,
+    type_code TEXT NOT NULL,
+    cached_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stock_listing (
+    code TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    type_code TEXT NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+"""
+
+
+@dataclass(frozen=True)
+class StockItem:
+    code: str
+    name: str
+    type_code: str
+
+    @property
+    def domestic(self) -> bool:
+        return self.type_code in LISTING_MARKETS
+
+
+def normalize(query: str) -> str:
+    """공백을 없애고 영문은 대문자로 맞춥니다."""
+    return "".join(query.split()).upper()
+
+
+class StockSearch:
+    """
+    Args:
+        filename: SQLite 파일 경로 (기본값은 PyKV와 같은 iris.db)
+        ttl: 디스크 검색 캐시 유지 시간(초)
+        listing_ttl: 종목 목록을 새로 받는 주기(초)
+        lru_size: 메모리에 두는 검색어 수
+    """
+
+    def __init__(self, filename: str = "iris.db", ttl: float = SEARCH_TTL, listing_ttl: float = LISTING_TTL, lru_size: int = LRU_SIZE):
+        self.filename = filename
+        self.ttl = ttl
+        self.listing_ttl = listing_ttl
+        self.lru_size = lru_size
+        self._local = threading.local()
+        self._lru: OrderedDict[str, StockItem] = OrderedDict()
+        self._lru_lock = threading.Lock()
+        self._by_name: dict[str, StockItem] = {}
+        self._by_code: dict[str, StockItem] = {}
+        self._prefix: list[tuple[str, StockItem]] = []
+        self._listing_lock = threading.Lock()
+        self._refresher: threading.Thread | None = None
+
+    def _get_db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.filename, check_same_thread=False)
+            db.executescript(SCHEMA)
+            db.commit()
+        return db
+
+    def search(self, query: str) -> StockItem | None:
+        """검색어에 맞는 종목. 네이버 자동완성에도 없으면 None"""
+        key = normalize(query)
+        if not key:
+            return None
+        name = ALIASES.get(key, query)
+        key = normalize(name)
+        self._ensure_listing()
+
+        item = self._lru_get(key) or self._local_lookup(key) or self._disk_get(key)
+        if item is None:
+            item = self._fetch(name)
+            if item is None:
+                return None
+            self._disk_put(key, item)
+        self._lru_put(key, item)
+        return item
+
+    def _lru_get(self, key: str) -> StockItem | None:
+        with self._lru_lock:
+            item = self._lru.get(key)
+            if item is not None:
+                self._lru.move_to_end(key)
+            return item
+
+    def _lru_put(self, key: str, item: StockItem):
+        with self._lru_lock:
+            self._lru[key] = item
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _local_lookup(self, key: str) -> StockItem | None:
+        """종목 목록에서 이름, 코드, 또는 한 종목만 걸리는 접두어로 찾습니다."""
+        item = self._by_name.get(key) or self._by_code.get(key)
+        if item is not None:
+            return item
+        prefix = self._prefix
+        start = bisect_left(prefix, (key,))
+        end = bisect_left(prefix, (key + "\U0010ffff",), start)
+        if end - start == 1:
+            return prefix[start][1]
+        return None
+
+    def _disk_get(self, key: str) -> StockItem | None:
+        row = self._get_db().execute(
+            "SELECT code, name, type_code FROM stock_search WHERE query = ? AND cached_at >= ?",
+            (key, int(time.time() - self.ttl)),
+        ).fetchone()
+        return StockItem(*row) if row else None
+
+    def _disk_put(self, key: str, item: StockItem):
+        db = self._get_db()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO stock_search (query, code, name, type_code, cached_at) VALUES (?, ?, ?, ?, ?)",
+                (key, item.code, item.name, item.type_code, int(time.time())),
+            )
+
+    def _fetch(self, query: str) -> StockItem | None:
+        response = http.get(AUTOCOMPLETE_URL.format(query=quote(query)))
+        response.raise_for_status()
+        items = response.json().get("items") or []
+        if not items or not items[0]:
+            return None
+        return StockItem(items[0]["code"], items[0]["name"], items[0]["typeCode"])
+
+    def _ensure_listing(self):
+        """처음 검색할 때 저장된 종목 목록을 읽고, 갱신 스레드를 띄웁니다."""
+        if self._refresher is not None:
+            return
+        with self._listing_lock:
+            if self._refresher is not None:
+                return
+            rows = self._get_db().execute("SELECT code, name, type_code, updated_at FROM stock_listing").fetchall()
+            self._index([StockItem(code, name, type_code) for code, name, type_code, _ in rows])
+            updated_at = min((row[3] for row in rows), default=0)
+            self._refresher = threading.Thread(target=self._refresh_loop, args=(updated_at,), name="stock-listing", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self, updated_at: float):
+        while True:
+            time.sleep(max(updated_at + self.listing_ttl - time.time(), 0))
+            try:
+                self.refresh_listing()
+                updated_at = time.time()
+            except Exception as e:
+                print(f"[StockSearch] 종목 목록을 갱신하지 못했습니다: {e}")
+                # 실패하면 10분 뒤에 다시 받습니다
+                updated_at = time.time() - self.listing_ttl + 600
+
+    def refresh_listing(self):
+        """코스피/코스닥 종목 목록을 받아서 저장하고 인덱스를 새로 만듭니다."""
+        items = []
+        for market in LISTING_MARKETS:
+            page = 1
+            while True:
+                response = http.get(LISTING_URL.format(market=market, page=page))
+                response.raise_for_status()
+                stocks = response.json().get("stocks") or []
+                items += [StockItem(stock["itemCode"], stock["stockName"], market) for stock in stocks]
+                if len(stocks) < 100:
+                    break
+                page += 1
+        if not items:
+            raise LookupError("종목 목록이 비어 있습니다")
+
+        now = int(time.time())
+        db = self._get_db()
+        with db:
+            db.execute("DELETE FROM stock_listing")
+            db.executemany(
+                "INSERT OR REPLACE INTO stock_listing (code, name, type_code, updated_at) VALUES (?, ?, ?, ?)",
+                [(item.code, item.name, item.type_code, now) for item in items],
+            )
+        self._index(items)
+
+    def _index(self, items: list[StockItem]):
+        by_name = {normalize(item.name): item for item in items}
+        by_code = {item.code: item for item in items}
+        prefix = sorted(by_name.items(), key=lambda entry: entry[0])
+        # 참조를 한 번에 바꿔서 검색 중에도 인덱스가 섞이지 않습니다
+        self._by_name, self._by_code, self._prefix = by_name, by_code, prefix
+
+
+stock_search = StockSearch()
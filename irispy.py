@@ -1,94 +1,69 @@
 from iris import ChatContext, Bot
 from iris.bot.models import ErrorContext
-from bots.gemini import get_gemini
-from bots.pyeval import python_eval, real_eval
-from bots.stock import create_stock_image
-from bots.imagen import get_imagen
-from bots.lyrics import get_lyrics, find_lyrics
-from bots.replyphoto import reply_photo
-from bots.text2image import draw_text
-from bots.coin import get_coin_info
-
-from iris.decorators import *
-from helper.BanControl import ban_user, unban_user
 from iris.kakaolink import IrisLink
 
-from bots.detect_nickname_change import detect_nickname_change
-import sys, threading
+from helper.CommandRouter import router
+from helper.Dispatcher import Dispatcher, WorkerPool, DROPPED
+from helper.BanControl import not_banned
 
-from bots.mentions import mention_user, mention_new_member, mention_self_and_bot, mention_room_master
-from bots.notification import share_notice_command, share_current_notice, set_notice_command, delete_notice_command, change_notice_command
-from bots.kakao_reaction import KakaoReaction, add_reaction_to_message
+import os, sys, threading
+
+# 시작할 때 바로 필요한 모듈 (이벤트 핸들러, 백그라운드 스레드)
+mentions = router.load("bots.mentions")
+kakao_reaction = router.load("bots.kakao_reaction")
+nickname = router.load("bots.detect_nickname_change")
+
+# @command로 명령어를 선언하는 모듈 목록
+# 선언만 먼저 읽고, 모듈은 명령어가 처음 호출될 때 불러옵니다
+PLUGINS = [
+    "helper.BanControl",
+    "helper.Dispatcher",
+    "bots.mentions",
+    "bots.detect_nickname_change",
+    "bots.notification",
+    "bots.kakao_reaction",
+    "bots.pyeval",
+    "bots.coin",
+    "bots.stock",
+    "bots.gemini",
+    "bots.imagen",
+    "bots.lyrics",
+    "bots.replyphoto",
+    "bots.text2image",
+]
+
+router.discover(PLUGINS)
 
 iris_url = sys.argv[1]
 bot = Bot(iris_url)
 
-reactor = KakaoReaction(iris_url)
-@bot.on_event("message")
-@is_not_banned
-def on_message(chat: ChatContext):
-    try:
-        match chat.message.command:
-
-            case "!멘션":
-                mention_user(chat)
-            
-            #case "!멘션1":
-            #    mention_self_and_bot(chat)
-            
-            case "!방장":
-                mention_room_master(chat)
-            
-            case "!공지":
-                share_notice_command(chat)
-            
-            case "!현재공지":
-                share_current_notice(chat)
-            
-            case "!공지등록":
-                set_notice_command(chat)
-            
-            case "!공지삭제":
-                delete_notice_command(chat)
-            
-            case "!공지수정":
-                change_notice_command(chat)
-
-            case "!react":
-                # !react 숫자 형태로 리액션 추가
-                try:
-                    reaction_num = chat.message.msg[7:].strip()
-                    
-                    if not reaction_num:
-                        chat.reply("사용법: !react [숫자]\n0:취소, 1:하트, 2:좋아요, 3:체크, 4:웃음, 5:놀람, 6:슬픔")
-                        return
-                    
-                    reaction_type = int(reaction_num)
-                    
-                    # 리액션 추가
-                    success = add_reaction_to_message(chat, reaction_type, reactor, iris_url)
-                    
-                except ValueError:
-                    chat.reply("숫자를 입력하세요!\n사용법: !react [숫자]\n0:취소, 1:하트, 2:좋아요, 3:체크, 4:웃음, 5:놀람, 6:슬픔")
-                except Exception as e:
-                    print(f"React error: {e}")
-                    chat.reply("리액션 추가 중 오류가 발생했습니다.")
+reactor = kakao_reaction.KakaoReaction(iris_url)
+router.context["reactor"] = reactor
+router.add_guard(not_banned)
 
-    except Exception as e :
-        print(e)
+# 방별 스케줄링 가중치 (방 ID: 한 차례에 연속으로 처리할 명령어 수, 기본 1)
+ROOM_WEIGHTS = {}
+
+# 명령어 비용 등급별 워커 풀 (워커 수, 전체 대기열 길이)
+# POOL_<등급>_WORKERS, POOL_<등급>_PENDING, ROOM_QUEUE_DEPTH 환경 변수로 조정
+dispatcher = Dispatcher([
+    WorkerPool.from_env("fast", 8, 64, ROOM_WEIGHTS),      # 텍스트 응답, 코인, 공지, 멘션
+    WorkerPool.from_env("network", 4, 16, ROOM_WEIGHTS),   # Gemini, Imagen, 가사 등 느린 외부 API
+    WorkerPool.from_env("cpu", 2, 8, ROOM_WEIGHTS),        # 이미지 렌더링
+    WorkerPool.from_env("eval", 1, 4, ROOM_WEIGHTS),       # !py, !ev
+])
+router.context["dispatcher"] = dispatcher
 
 @bot.on_event("message")
-@is_not_banned
 def on_message(chat: ChatContext):
     try:
-        match chat.message.command:
-            
-            case "!py":
-                python_eval(chat)
-            
-            case "!ev":
-                real_eval(chat, kl)
-            
+        cmd = router.match(chat)
+        if cmd is None:
+            return
+        result = dispatcher.submit(cmd.cost, chat.room.id, router.dedup_key(cmd, chat), router.run, cmd, chat)
+        if result == DROPPED:
+            # 폭주 중인 방에 거절 메시지를 보내면 부하가 더 늘어나므로 기록만 남김
+            print(f"[Dispatcher] {chat.room.id} 방 대기열이 가득 차서 {cmd.name} 요청을 버렸습니다")
     except Exception as e :
         print(e)
 
@@ -98,15 +73,17 @@ WELCOME_ROOMS = [18472312239224835,18469145050793422]
 #입장감지
 @bot.on_event("new_member")
 def on_newmem(chat: ChatContext):
+    mentions.invalidate_room_master(chat.room.id)
     if chat.room.id in WELCOME_ROOMS:
-        mention_new_member(chat)
+        mentions.mention_new_member(chat)
     #chat.reply(f"Hello {chat.sender.name}")
 
 #퇴장감지
 @bot.on_event("del_member")
 def on_delmem(chat: ChatContext):
+    mentions.invalidate_room_master(chat.room.id)
     if chat.room.id in WELCOME_ROOMS:
-        mention_new_member(chat)
+        mentions.mention_new_member(chat)
     #chat.reply(f"Bye {chat.sender.name}")
 
 
@@ -117,8 +94,17 @@ def on_error(err: ErrorContext):
 
 if __name__ == "__main__":
     #닉네임감지를 사용하지 않는 경우 주석처리
-    nickname_detect_thread = threading.Thread(target=detect_nickname_change, args=(bot.iris_url,))
+    nickname_detect_thread = threading.Thread(target=nickname.detect_nickname_change, args=(bot.iris_url,))
     nickname_detect_thread.start()
     #카카오링크를 사용하지 않는 경우 주석처리
     kl = IrisLink(bot.iris_url)
+    router.context["kl"] = kl
+    #코인 가격 알림, 김프 기록, 실시간 시세(COIN_STREAM=1)
+    #bots.coin과 의존성(numpy, pytz 등)을 불러오는 데 시간이 걸리므로 봇 시작을 막지 않게 백그라운드에서 시작
+    threading.Thread(target=lambda: router.load("bots.coin").start_services(bot.iris_url), name="coin-services", daemon=True).start()
+
+    print(router.timing_report())
+    #PLUGIN_WARMUP=0 이면 명령어가 처음 호출될 때까지 모듈을 불러오지 않음
+    if os.getenv("PLUGIN_WARMUP", "1") != "0":
+        threading.Thread(target=router.warm_up, daemon=True).start()
     bot.run()
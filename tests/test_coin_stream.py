@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from helper.CoinMarket import TickerCache
+from helper.CoinStream import ReplayFeed, StreamFeed, parse_binance, parse_upbit
+
+UPBIT_MESSAGES = [
+    {"type": "ticker", "code": "KRW-BTC", "trade_price": 95000000.0, "signed_change_rate": 0.0125},
+    {"type": "orderbook", "code": "KRW-BTC"},
+    {"type": "ticker", "code": "KRW-ETH", "trade_price": 4500000.0, "signed_change_rate": -0.02},
+]
+BINANCE_MESSAGES = [
+    [{"s": "BTCUSDT", "c": "68000.00", "o": "67000.00"}, {"s": "ETHBTC", "c": "0.05", "o": "0.05"}],
+    [{"s": "BTCUSDT", "c": "68500.00", "o": "67000.00"}],
+]
+
+
+def write_records(path: str, messages: list, step: float = 0.0):
+    """COIN_STREAM_RECORD와 같은 형식으로 기록 파일을 만듭니다."""
+    with open(path, "w", encoding="utf-8") as f:
+        for index, message in enumerate(messages):
+            f.write(json.dumps({"t": index * step, "data": json.dumps(message)}, ensure_ascii=False) + "\n")
+        f.write("\n")
+
+
+class ReplayFeedTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test_replays_upbit_records(self):
+        write_records(self.path("upbit"), UPBIT_MESSAGES)
+
+        tickers = [ticker for message in ReplayFeed(self.path("upbit"), speed=0)() for ticker in parse_upbit(message)]
+
+        self.assertEqual([ticker.key for ticker in tickers], ["KRW-BTC", "KRW-ETH"])
+        self.assertEqual(tickers[0].price, 95000000.0)
+        self.assertAlmostEqual(tickers[0].change, 1.25)
+        self.assertAlmostEqual(tickers[1].change, -2.0)
+
+    def test_replays_binance_records(self):
+        write_records(self.path("binance"), BINANCE_MESSAGES)
+
+        batches = [parse_binance(message) for message in ReplayFeed(self.path("binance"), speed=0)()]
+
+        self.assertEqual([[ticker.key for ticker in batch] for batch in batches], [["BTCUSDT", "ETHBTC"], ["BTCUSDT"]])
+        self.assertEqual(batches[1][0].price, 68500.0)
+        self.assertAlmostEqual(batches[0][0].change, 100 / 67)
+
+    def test_speed_scales_recorded_delays(self):
+        write_records(self.path("binance"), BINANCE_MESSAGES, step=1.0)
+
+        started = time.monotonic()
+        messages = list(ReplayFeed(self.path("binance"), speed=20)())
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(len(messages), 2)
+        self.assertGreaterEqual(elapsed, 0.04)
+        self.assertLess(elapsed, 0.5)
+
+    def test_stream_feed_fills_cache_from_replay(self):
+        write_records(self.path("binance"), BINANCE_MESSAGES)
+        cache = TickerCache(lambda keys: [])
+        feed = StreamFeed("replay", cache, ReplayFeed(self.path("binance"), speed=0), parse_binance,
+                          record_to=self.path("recorded"))
+
+        feed.start()
+        deadline = time.monotonic() + 2
+        while feed.messages < len(BINANCE_MESSAGES) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        feed.stop()
+        feed._thread.join(2)
+
+        self.assertEqual(cache.peek("BTCUSDT").price, 68500.0)
+        self.assertEqual(cache.peek("ETHBTC").price, 0.05)
+        # 다시 기록한 파일도 같은 메세지로 재생됩니다
+        replayed = [json.loads(message) for message in ReplayFeed(self.path("recorded"), speed=0)()]
+        self.assertEqual(replayed[:len(BINANCE_MESSAGES)], BINANCE_MESSAGES)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from helper.StockSearch import StockSearch
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FakeHttp:
+    """자동완성 검색어가 정확히 "삼성전자"일 때만 종목을 돌려줍니다."""
+
+    def __init__(self):
+        self.queries = []
+
+    def get(self, url, **kwargs):
+        query = parse_qs(urlsplit(url).query)["q"][0]
+        self.queries.append(query)
+        if query == "삼성전자":
+            return FakeResponse({"items": [{"code": "005930", "name": "삼성전자", "typeCode": "KOSPI"}]})
+        return FakeResponse({"items": []})
+
+
+class StockSearchAliasTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.filename = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.search = StockSearch(self.filename)
+        # 종목 목록을 불러오지 않고 갱신 스레드도 띄우지 않습니다
+        self.search._refresher = threading.Thread()
+        self.http = FakeHttp()
+        patcher = mock.patch("helper.StockSearch.http", self.http)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.search._get_db().close()
+        os.remove(self.filename)
+
+    def test_alias_is_resolved_before_autocomplete(self):
+        item = self.search.search("삼전")
+
+        self.assertIsNotNone(item)
+        self.assertEqual(item.code, "005930")
+        self.assertEqual(self.http.queries, ["삼성전자"])
+
+    def test_alias_hit_is_cached_under_resolved_name(self):
+        self.search.search("삼전")
+        item = self.search.search("삼성전자")
+
+        self.assertEqual(item.code, "005930")
+        self.assertEqual(self.http.queries, ["삼성전자"])
+
+
+if __name__ == "__main__":
+    unittest.main()